@@ -0,0 +1,49 @@
+-- ============================================================================
+-- Migration: Add Residency Columns to Profiles
+-- Created: 2026-02-01
+-- Purpose: Store the Nigerian / non-Nigerian classification produced by the
+--          account-dump extraction scripts (test/sync_profiles.py)
+-- ============================================================================
+
+-- ============================================================================
+-- STEP 1: Add residency columns
+-- ============================================================================
+
+ALTER TABLE public.profiles
+  ADD COLUMN IF NOT EXISTS residency_status TEXT,        -- 'NON-NIGERIAN' or 'UNKNOWN'
+  ADD COLUMN IF NOT EXISTS residency_reason TEXT,        -- detection_reason from the extraction
+  ADD COLUMN IF NOT EXISTS residency_source TEXT,        -- 'address' or 'phone'
+  ADD COLUMN IF NOT EXISTS residency_checked_at TIMESTAMPTZ;
+
+ALTER TABLE public.profiles
+  DROP CONSTRAINT IF EXISTS valid_residency_status;
+ALTER TABLE public.profiles
+  ADD CONSTRAINT valid_residency_status
+  CHECK (residency_status IS NULL OR residency_status IN ('NON-NIGERIAN', 'UNKNOWN'));
+
+-- ============================================================================
+-- STEP 2: Create indexes for performance
+-- ============================================================================
+
+-- Index for filtering profiles by residency
+CREATE INDEX IF NOT EXISTS idx_profiles_residency_status ON public.profiles(residency_status)
+WHERE residency_status IS NOT NULL;
+
+-- ============================================================================
+-- ROLLBACK (if needed)
+-- ============================================================================
+
+-- To rollback this migration, run:
+/*
+DROP INDEX IF EXISTS public.idx_profiles_residency_status;
+ALTER TABLE public.profiles DROP CONSTRAINT IF EXISTS valid_residency_status;
+ALTER TABLE public.profiles
+  DROP COLUMN IF EXISTS residency_status,
+  DROP COLUMN IF EXISTS residency_reason,
+  DROP COLUMN IF EXISTS residency_source,
+  DROP COLUMN IF EXISTS residency_checked_at;
+*/
+
+-- ============================================================================
+-- END OF MIGRATION
+-- ============================================================================
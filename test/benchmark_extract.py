@@ -0,0 +1,209 @@
+"""
+Benchmark harness for the extraction scripts.
+
+Runs two kinds of measurements against a dump (see generate_dump.py):
+1. A stage breakdown: one serial pass that times parsing, email validation,
+   phone classification, address classification and output writing
+   separately.
+2. End-to-end runs of extract_all() for each requested worker count, each
+   in a fresh interpreter, reporting wall time, rows/sec and peak RSS.
+
+Usage:
+    python generate_dump.py synthetic_accts.txt --rows 1000000
+    python benchmark_extract.py synthetic_accts.txt --workers 1 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from extract_pipeline import clean_email, open_sinks, projected_columns
+from extract_reader import RowParser, iter_lines, read_header
+from extract_non_ng_emails import PhoneRule
+from extract_non_ng_address import AddressRule
+
+# ============================================================================
+# MEMORY
+# ============================================================================
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or its finished children) in MB."""
+    if resource is not None:
+        who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+        peak = resource.getrusage(who).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    if children:
+        return None
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+# ============================================================================
+# STAGE BREAKDOWN
+# ============================================================================
+
+STAGES = ['parse', 'validate email', 'classify phone', 'classify address', 'write']
+
+def benchmark_stages(input_file, output_dir):
+    """
+    Run both rules over the dump serially, timing each stage of the per-row
+    work separately. Returns the per-stage seconds and the row count.
+    """
+    clock = time.perf_counter
+    timings = dict.fromkeys(STAGES, 0.0)
+    phone_rule, address_rule = PhoneRule(), AddressRule()
+    rules = [(phone_rule, 'classify phone'), (address_rule, 'classify address')]
+
+    columns, data_start = read_header(input_file)
+    email_idx = columns.index('E_MAIL')
+    for rule, _ in rules:
+        rule.bind(columns)
+    parser = RowParser(len(columns), projected_columns([rule for rule, _ in rules], email_idx))
+    sinks = {
+        phone_rule.name: open_sinks(phone_rule, os.path.join(output_dir, 'phone.csv')),
+        address_rule.name: open_sinks(address_rule, os.path.join(output_dir, 'address.csv')),
+    }
+
+    rows = 0
+    lines = iter_lines(input_file, data_start)
+    while True:
+        start = clock()
+        line = next(lines, None)
+        if line is None:
+            break
+        parts = parser(line)
+        now = clock()
+        timings['parse'] += now - start
+        rows += 1
+
+        email = None
+        for rule, stage in rules:
+            if len(parts) <= rule.min_fields:
+                continue
+            if email is None:
+                start = clock()
+                email = clean_email(parts[email_idx].strip())
+                timings['validate email'] += clock() - start
+            if not email:
+                continue
+
+            start = clock()
+            bucket, record = rule.classify(parts, email)
+            now = clock()
+            timings[stage] += now - start
+            if bucket:
+                sinks[rule.name][bucket].write(record)
+                timings['write'] += clock() - now
+
+    for rule_sinks in sinks.values():
+        for sink in rule_sinks.values():
+            sink.close()
+    return timings, rows
+
+# ============================================================================
+# END-TO-END RUNS
+# ============================================================================
+
+def run_child(input_file, output_dir, workers):
+    """Child-process entry: run extract_all() and report timings as JSON."""
+    from extract_all import extract_all
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        counts = extract_all(input_file, os.path.join(output_dir, 'phone.csv'),
+                             os.path.join(output_dir, 'address.csv'), workers=workers)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'rows': counts['total_records'],
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'worker_peak_rss_mb': peak_rss_mb(children=True) if workers > 1 else None,
+    }))
+
+def benchmark_end_to_end(input_file, output_dir, workers):
+    """Run extract_all() in a fresh interpreter so peak RSS is measured per run."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), input_file, '--child',
+         '--output-dir', output_dir, '--workers', str(workers)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def format_mb(value):
+    return f"{value:,.1f} MB" if value is not None else 'n/a'
+
+def run_benchmarks(input_file, worker_counts, json_file=None):
+    """Run the stage breakdown and the end-to-end runs, and print a report."""
+    input_file = os.path.abspath(input_file)
+    report = {'input_file': input_file, 'size_mb': os.path.getsize(input_file) / (1024 * 1024)}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        print(f"Benchmarking: {input_file} ({report['size_mb']:,.1f} MB)")
+
+        timings, rows = benchmark_stages(input_file, output_dir)
+        total = sum(timings.values())
+        report['stages'] = {'rows': rows, 'seconds': timings}
+
+        print(f"\n{'='*60}")
+        print(f"STAGE BREAKDOWN ({rows:,} rows, serial)")
+        print(f"{'='*60}")
+        for stage in STAGES:
+            share = timings[stage] / total * 100 if total else 0
+            print(f"{stage:<20}{timings[stage]:>9.2f}s  {share:5.1f}%")
+        print(f"{'total':<20}{total:>9.2f}s  ({rows / total if total else 0:,.0f} rows/sec)")
+
+        print(f"\n{'='*60}")
+        print("END-TO-END (extract_all)")
+        print(f"{'='*60}")
+        report['runs'] = []
+        for workers in worker_counts:
+            run = benchmark_end_to_end(input_file, output_dir, workers)
+            run['workers'] = workers
+            report['runs'].append(run)
+            rate = run['rows'] / run['seconds'] if run['seconds'] else 0
+            line = (f"workers={workers:<3}{run['seconds']:>9.2f}s  {rate:>12,.0f} rows/sec  "
+                    f"peak RSS {format_mb(run['peak_rss_mb'])}")
+            if run['worker_peak_rss_mb'] is not None:
+                line += f" (largest worker {format_mb(run['worker_peak_rss_mb'])})"
+            print(line)
+        print(f"{'='*60}")
+
+    if json_file:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {json_file}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help='worker counts to run end-to-end (default: 1)')
+    parser.add_argument('--json', help='also write the report to this JSON file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.input, args.output_dir, args.workers[0])
+    else:
+        run_benchmarks(args.input, args.workers, args.json)
@@ -0,0 +1,56 @@
+"""
+Regression check of determine_location_status() on addresses and states
+the fuzzy gazetteer match has got wrong before.
+
+A near miss on a gazetteer name (RIVER ~ RIVERS, BERGEN ~ BERGER, DURBAR ~
+DURBAN) must leave the row UNKNOWN for review instead of labelling it, and
+explicit non-Nigerian states must keep their label. Needs no database:
+    python check_location_status.py
+
+Exits with status 1 if any case does not match.
+"""
+
+import sys
+
+from extract_non_ng_address import determine_location_status
+
+# (nationality, geo location, state, address), expected (status, reason prefix)
+CASES = [
+    (('', '', '', '9 RIVER PLACE, BOSTON'),
+     ('UNKNOWN', 'Fuzzy Nigerian location (review): RIVER ~ RIVERS')),
+    (('', '', '', '14 STRANDGATEN, BERGEN, NORWAY'),
+     ('UNKNOWN', 'Fuzzy Nigerian location (review): BERGEN ~ BERGER')),
+    (('', '', '', '22 AVENIDA RIVERA, MONTEVIDEO'),
+     ('UNKNOWN', 'Fuzzy Nigerian location (review): RIVERA ~ RIVERS')),
+    (('', '', '', '3 ANTONY CLOSE, SLOUGH'),
+     ('UNKNOWN', 'Fuzzy Nigerian location (review): ANTONY ~ ANTHONY')),
+    (('', '', '', '12 DURBAR ROAD'),
+     ('UNKNOWN', 'Fuzzy foreign location (review): DURBAR ~ DURBAN')),
+    (('', '', '', '5 PORTHARCOURT ROAD'),
+     ('NIGERIAN', 'Fuzzy Nigerian location: PORTHARCOURT ~ PORT HARCOURT')),
+    (('', '', 'LONDON', ''), ('NON-NIGERIAN', 'Non-Nigerian state: LONDON')),
+    (('', '', 'KENT', ''), ('NON-NIGERIAN', 'Non-Nigerian state: KENT')),
+    (('', '', 'LAGOS ST', ''), ('NIGERIAN', 'Exact Nigerian location: LAGOS')),
+    (('', '', 'LAGOSS', ''), ('UNKNOWN', 'Fuzzy Nigerian location (review): LAGOSS ~ LAGOS')),
+]
+
+def check_location_status():
+    """Run the check. Returns the number of failed cases."""
+    failures = 0
+    print(f"\n{'='*60}")
+    print("LOCATION STATUS CHECK")
+    print(f"{'='*60}")
+    for values, (status, reason) in CASES:
+        actual = determine_location_status(*values)
+        ok = actual[0] == status and actual[1].startswith(reason)
+        failures += not ok
+        print(f"{'PASS' if ok else 'FAIL'}  {' | '.join(v for v in values if v)}")
+        if not ok:
+            print(f"      expected: ({status!r}, {reason!r}...)")
+            print(f"      got:      {actual}")
+    print(f"{'='*60}")
+    print(f"{len(CASES) - failures} of {len(CASES)} cases passed")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_location_status() else 0)
@@ -0,0 +1,302 @@
+"""
+Long-running classification service for new sign-ups.
+
+Loads the gazetteers and the matchers built from them once and serves
+verdicts over a local HTTP endpoint, so callers don't pay for a new
+interpreter per check.
+Records from concurrent requests are grouped into micro-batches: the first
+waiting record opens a batch, which is classified as soon as it is full or
+MAX_WAIT_MS has passed. Per-request latency percentiles are kept for the
+most recent requests.
+
+Endpoints:
+    POST /classify   {"records": [{"account_no": ..., "nationality": ..., "geo_location": ...,
+                                   "state": ..., "address": ..., "phone": ..., "email": ...}]}
+                     (dump column names such as STATE_OF_RES and MOB_NUM work too;
+                     values are strings or null)
+    GET  /metrics    request/batch counters and p50/p99 latency
+    GET  /health
+
+Usage:
+    python classify_service.py --port 8765
+    curl -s localhost:8765/classify -d '{"records": [{"nationality": "GHANAIAN", "phone": "+233201234567"}]}'
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+from extract_verdicts import classify_account
+
+# ============================================================================
+# SETTINGS
+# ============================================================================
+
+# A batch is classified once it holds this many records...
+MAX_BATCH_RECORDS = 256
+# ...or once its first record has waited this long
+MAX_WAIT_MS = 2.0
+# Requests kept for the latency percentiles
+LATENCY_WINDOW = 10000
+# Largest request body accepted
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Request field name -> dump column expected by classify_account()
+FIELD_COLUMNS = {
+    'email': 'E_MAIL',
+    'phone': 'MOB_NUM',
+    'nationality': 'NATIONALITY',
+    'geo_location': 'CUS_GEO_LOCA',
+    'state': 'STATE_OF_RES',
+    'address': 'ADDRESS',
+}
+
+def invalid_fields(record):
+    """Keys of a request record that would be classified but hold neither a string nor null."""
+    columns = FIELD_COLUMNS.values()
+    return [key for key, value in record.items()
+            if FIELD_COLUMNS.get(key, key) in columns and not (value is None or isinstance(value, str))]
+
+def record_values(record):
+    """Map a request record onto the dump columns, defaulting missing ones to ''."""
+    values = {column: '' for column in FIELD_COLUMNS.values()}
+    for key, value in record.items():
+        column = FIELD_COLUMNS.get(key, key)
+        if column in values:
+            values[column] = value or ''
+    return values
+
+def classify_record(record):
+    verdict = classify_account(record_values(record))
+    for key in ('id', 'account_no'):
+        if key in record:
+            verdict[key] = record[key]
+    return verdict
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))]
+
+# ============================================================================
+# MICRO-BATCHING
+# ============================================================================
+
+class MicroBatcher:
+    """Collects records from concurrent requests and classifies them in batches."""
+
+    def __init__(self, max_batch=MAX_BATCH_RECORDS, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = asyncio.Queue()
+        self.stats = {'batches': 0, 'records': 0, 'full_batches': 0, 'classify_seconds': 0.0}
+
+    async def classify(self, records):
+        """Queue records for the next batches and wait for their verdicts."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for record in records:
+            future = loop.create_future()
+            self.pending.put_nowait((record, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                # Take whatever is already queued without yielding
+                while len(batch) < self.max_batch and not self.pending.empty():
+                    batch.append(self.pending.get_nowait())
+                timeout = deadline - loop.time()
+                if len(batch) >= self.max_batch or timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.process(batch)
+
+    def process(self, batch):
+        began = time.perf_counter()
+        for record, future in batch:
+            if future.cancelled():
+                continue
+            try:
+                future.set_result(classify_record(record))
+            except Exception as e:
+                future.set_exception(e)
+        self.stats['classify_seconds'] += time.perf_counter() - began
+        self.stats['batches'] += 1
+        self.stats['records'] += len(batch)
+        if len(batch) >= self.max_batch:
+            self.stats['full_batches'] += 1
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class ClassifyService:
+    """Minimal HTTP/1.1 front end (keep-alive, JSON bodies) for the batcher."""
+
+    def __init__(self, max_batch=MAX_BATCH_RECORDS, max_wait_ms=MAX_WAIT_MS):
+        self.batcher = MicroBatcher(max_batch, max_wait_ms)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        stats = self.batcher.stats
+        to_ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'errors': self.errors,
+            'records': stats['records'],
+            'batches': stats['batches'],
+            'avg_batch_size': round(stats['records'] / stats['batches'], 2) if stats['batches'] else 0,
+            'full_batches': stats['full_batches'],
+            'classify_us_per_record': (round(stats['classify_seconds'] / stats['records'] * 1e6, 3)
+                                       if stats['records'] else 0),
+            'latency_ms': {
+                'window': len(latencies),
+                'p50': to_ms(percentile(latencies, 50)),
+                'p99': to_ms(percentile(latencies, 99)),
+                'max': to_ms(latencies[-1] if latencies else None),
+            },
+        }
+
+    async def route(self, method, path, body):
+        """Return (status, payload) for one request."""
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok'}
+        if path == '/metrics' and method == 'GET':
+            return 200, self.metrics()
+        if path != '/classify':
+            return 404, {'error': f'unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': 'body is not valid JSON'}
+        records = payload.get('records') if isinstance(payload, dict) else payload
+        if isinstance(payload, dict) and records is None:
+            records = [payload]
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            return 400, {'error': 'expected {"records": [{...}, ...]}'}
+        for i, record in enumerate(records):
+            invalid = invalid_fields(record)
+            if invalid:
+                return 400, {'error': f"record {i}: {', '.join(invalid)} must be a string or null"}
+
+        began = time.perf_counter()
+        verdicts = await self.batcher.classify(records)
+        self.latencies.append(time.perf_counter() - began)
+        return 200, {'results': verdicts}
+
+    async def read_head(self, reader):
+        """
+        Read a request line and headers. Returns (request_line, headers), or
+        None once the client has closed the connection.
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return request_line.decode('latin-1').split(), headers
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                oversized = False
+                try:
+                    head = await self.read_head(reader)
+                except (ValueError, asyncio.LimitOverrunError):
+                    # A line longer than the reader's buffer limit; readline()
+                    # reports the LimitOverrunError as a ValueError
+                    oversized, head = True, ([], {})
+                if head is None:
+                    break
+                request_line, headers = head
+                length = headers.get('content-length') or '0'
+                version = body = None
+
+                # The body of a bad request is never read, so its connection is closed
+                if oversized:
+                    status, payload = 431, {'error': 'request line or header too large'}
+                elif len(request_line) != 3:
+                    status, payload = 400, {'error': 'malformed request line'}
+                elif not (length.isascii() and length.isdigit()):
+                    status, payload = 400, {'error': 'invalid Content-Length'}
+                elif int(length) > MAX_BODY_BYTES:
+                    status, payload = 413, {'error': 'request body too large'}
+                else:
+                    method, path, version = request_line
+                    length = int(length)
+                    body = await reader.readexactly(length) if length else b''
+                    self.requests += 1
+                    try:
+                        status, payload = await self.route(method, path.split('?')[0], body)
+                    except Exception as e:
+                        status, payload = 500, {'error': str(e)}
+
+                if status >= 400:
+                    self.errors += 1
+                keep_alive = (body is not None and headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        # Exercise the classifiers once so the first sign-up doesn't pay for lazy setup
+        classify_record({'nationality': 'NIGERIA', 'phone': '08031234567'})
+        batcher = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Classification service listening on http://{host}:{port} "
+              f"(batches of up to {self.batcher.max_batch}, {self.batcher.max_wait * 1000:g} ms wait)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH_RECORDS,
+                        help='records per micro-batch')
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help='longest a record waits for its batch to fill')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(ClassifyService(args.max_batch, args.max_wait_ms).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,56 @@
+"""
+Script to run the phone number and address extractions in a single pass.
+The account dump is read once and both classifications are applied to each
+record, streaming results to the same output files the individual scripts
+produce.
+"""
+
+import argparse
+
+from extract_pipeline import BATCH_ROWS, run_pipeline
+from extract_non_ng_emails import PhoneRule
+from extract_non_ng_address import AddressRule
+
+def extract_all(input_file, phone_output_file, address_output_file, workers=1,
+                incremental=False, dedupe='digest', metrics_file=None, progress_interval=None,
+                compress=None, sqlite_file=None, batch_rows=None):
+    """
+    Extract non-Nigerian phone and address records in one pass over the dump.
+    Options are passed on to run_pipeline(), which documents them.
+    """
+    return run_pipeline(input_file, [
+        (PhoneRule(), phone_output_file),
+        (AddressRule(), address_output_file),
+    ], workers=workers, incremental=incremental, dedupe=dedupe,
+       metrics_file=metrics_file, progress_interval=progress_interval, compress=compress,
+       sqlite_file=sqlite_file, batch_rows=batch_rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--input', default=r"c:\Users\Wisdom\Desktop\MONEY-HIVE\All Accts.txt",
+                        help='account dump, plain or compressed (.gz, .bz2, .xz)')
+    parser.add_argument('--phone-output', default=r"c:\Users\Wisdom\Desktop\MONEY-HIVE\non_nigerian_emails.csv")
+    parser.add_argument('--address-output', default=r"c:\Users\Wisdom\Desktop\MONEY-HIVE\non_nigerian_address.csv")
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes (default: 1, serial)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only process rows appended since the last checkpointed run')
+    parser.add_argument('--dedupe', choices=['digest', 'bloom', 'off'], default='digest',
+                        help='how repeated emails are dropped from the emails-only files')
+    parser.add_argument('--metrics', metavar='JSON_FILE',
+                        help='profile the run and write per-stage metrics to this file')
+    parser.add_argument('--progress', type=float, metavar='SECONDS',
+                        help='print throughput every SECONDS while running')
+    parser.add_argument('--compress', choices=['gz', 'bz2', 'xz'],
+                        help='compress the output files')
+    parser.add_argument('--sqlite', metavar='DB_FILE',
+                        help='also load the results into this SQLite database')
+    parser.add_argument('--batch', type=int, nargs='?', const=BATCH_ROWS, metavar='ROWS',
+                        help=f'classify in columnar blocks with NumPy (default block: {BATCH_ROWS:,} rows)')
+    args = parser.parse_args()
+
+    extract_all(args.input, args.phone_output, args.address_output,
+                workers=args.workers, incremental=args.incremental,
+                dedupe=None if args.dedupe == 'off' else args.dedupe,
+                metrics_file=args.metrics, progress_interval=args.progress,
+                compress=args.compress, sqlite_file=args.sqlite, batch_rows=args.batch)
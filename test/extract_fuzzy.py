@@ -0,0 +1,128 @@
+"""
+Fuzzy gazetteer lookup for misspelled location names.
+
+Terms are indexed by their character trigrams. A word (or run of up to
+MAX_WINDOW_TOKENS words) from the input only gets an edit-distance check
+against the few terms that share the most trigrams with it. The number of
+words, windows and candidates looked at are all capped, so the cost per
+call stays bounded however long or noisy the text is.
+"""
+
+import re
+
+# Terms shorter than this (once spaces and punctuation are dropped) are
+# only ever matched exactly; fuzzy matches on them are mostly noise
+MIN_TERM_LENGTH = 5
+# Words of the text considered, and longest run of words joined into one candidate
+MAX_TOKENS = 16
+MAX_WINDOW_TOKENS = 3
+# Terms checked with edit distance per window
+MAX_CANDIDATES = 3
+# Share of trigrams a window and term must have in common (Dice coefficient)
+MIN_TRIGRAM_SIMILARITY = 0.4
+# Lowest confidence (1 - edit distance / length) reported as a match; one
+# edit in a 6-letter name passes, a substitution in a 5-letter one does not.
+# Callers may ask more of some matches (foreign names, in the address check)
+MIN_CONFIDENCE = 0.82
+# Shortest word joined with its neighbours into a multi-word candidate
+MIN_JOINED_TOKEN = 3
+
+WORD = re.compile(r'[A-Z]+')
+
+def match_key(text):
+    """Letters only, upper-cased, so 'PORT-HARCOURT' and 'PORT HARCOURT' compare equal."""
+    return ''.join(WORD.findall(text.upper()))
+
+def trigrams(key):
+    padded = f' {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_distance(length):
+    """Edit distance allowed for a term of the given length."""
+    return 1 if length <= 6 else 2 if length <= 10 else 3
+
+def bounded_levenshtein(a, b, limit):
+    """Edit distance between a and b, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class TrigramIndex:
+    """Inverted trigram index over gazetteer terms, each tagged with a category."""
+
+    def __init__(self, terms):
+        """terms: {term: category}. Terms sharing a match key keep the first category given."""
+        self.entries = {}
+        self.sizes = {}
+        self.postings = {}
+        for term, category in terms.items():
+            key = match_key(term)
+            if len(key) < MIN_TERM_LENGTH or key in self.entries:
+                continue
+            grams = trigrams(key)
+            self.entries[key] = (term, category)
+            self.sizes[key] = len(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(key)
+        self.max_key_length = max((len(key) for key in self.entries), default=0)
+
+    def windows(self, text):
+        """Candidate strings: single words and runs of adjacent words, joined."""
+        tokens = WORD.findall(text.upper())[:MAX_TOKENS]
+        for size in range(1, MAX_WINDOW_TOKENS + 1):
+            for start in range(len(tokens) - size + 1):
+                words = tokens[start:start + size]
+                # Initials and stray letters only add noise to a joined candidate
+                if size > 1 and min(len(word) for word in words) < MIN_JOINED_TOKEN:
+                    continue
+                window = ''.join(words)
+                if MIN_TERM_LENGTH <= len(window) <= self.max_key_length + 3:
+                    yield ' '.join(words), window
+
+    def candidates(self, window):
+        """The terms sharing the most trigrams with window, best first."""
+        grams = trigrams(window)
+        shared = {}
+        for gram in grams:
+            for key in self.postings.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        scored = []
+        for key, count in shared.items():
+            # A length gap beyond the allowed edit distance can never match
+            if abs(len(key) - len(window)) > max_distance(len(key)):
+                continue
+            similarity = 2 * count / (len(grams) + self.sizes[key])
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((similarity, key))
+        scored.sort(reverse=True)
+        return [key for _, key in scored[:MAX_CANDIDATES]]
+
+    def best_match(self, text):
+        """
+        Best fuzzy match of any gazetteer term in text, as
+        (category, term, matched text, confidence), or None.
+        """
+        best = None
+        for words, window in self.windows(text):
+            for key in self.candidates(window):
+                limit = max_distance(len(key))
+                distance = bounded_levenshtein(window, key, limit)
+                if distance > limit:
+                    continue
+                confidence = 1 - distance / max(len(window), len(key))
+                if confidence < MIN_CONFIDENCE or (best and confidence < best[3]):
+                    continue
+                # On a tie a foreign term wins, as it does for exact matches
+                if best is None or confidence > best[3] or self.entries[key][1] == 'FOREIGN':
+                    term, category = self.entries[key]
+                    best = (category, term, words, confidence)
+        return best
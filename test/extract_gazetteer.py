@@ -0,0 +1,162 @@
+"""
+Gazetteer data files and the on-disk cache of the matchers built from them.
+
+Each gazetteer is a versioned TSV file in gazetteers/ with one TERM<TAB>COUNTRY
+entry per line (ISO 3166-1 alpha-2 codes, NG for Nigerian places). The
+matchers built from them (prefix maps, category map, trigram index) are
+plain dicts and objects, cached as a pickle next to the data and used as
+loaded: a start with unchanged files only unpickles them, with no build or
+compile step, in the main process and in every spawned worker. The cache
+is rebuilt whenever a file is added, removed, or its mtime, size or SHA-1
+changes, and whenever the interpreter or the builder version differs.
+
+Set GAZETTEER_DIR to load the files from another directory.
+"""
+
+import os
+import re
+import sys
+import time
+import pickle
+import hashlib
+
+GAZETTEER_DIR = os.environ.get(
+    'GAZETTEER_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteers'))
+GAZETTEER_SUFFIX = '.tsv'
+CACHE_DIRNAME = '.cache'
+# Bump when the layout of the cache file changes
+CACHE_FORMAT = 3
+
+COUNTRY_CODE = re.compile(r'^[A-Z]{2}$')
+
+# ============================================================================
+# DATA FILES
+# ============================================================================
+
+def gazetteer_files(data_dir=GAZETTEER_DIR):
+    """{name: path} of the gazetteer files in data_dir."""
+    return {name[:-len(GAZETTEER_SUFFIX)]: os.path.join(data_dir, name)
+            for name in sorted(os.listdir(data_dir)) if name.endswith(GAZETTEER_SUFFIX)}
+
+def read_gazetteer(path):
+    """
+    Parse one gazetteer file into (version, {term: country}), in file order.
+    Blank lines and # comments are skipped; a '# version:' comment sets the version.
+    """
+    version = None
+    entries = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if line.startswith('#'):
+                key, _, value = line[1:].partition(':')
+                if key.strip().lower() == 'version':
+                    version = value.strip()
+                continue
+            if not line.strip():
+                continue
+            term, sep, country = line.partition('\t')
+            term, country = term.strip().upper(), country.strip().upper()
+            if not sep or not term or not COUNTRY_CODE.match(country):
+                raise ValueError(f"{path}:{line_no}: expected TERM<TAB>COUNTRY, got {line!r}")
+            # The first entry for a term wins
+            entries.setdefault(term, country)
+    return version, entries
+
+def load_gazetteers(data_dir=GAZETTEER_DIR):
+    """{name: {'version': ..., 'entries': {term: country}}} for every file in data_dir."""
+    gazetteers = {}
+    for name, path in gazetteer_files(data_dir).items():
+        version, entries = read_gazetteer(path)
+        gazetteers[name] = {'version': version, 'entries': entries}
+    return gazetteers
+
+def file_stamp(path):
+    """(mtime_ns, size, sha1) of a file."""
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def cache_key(build_version, sources):
+    return {
+        'format': CACHE_FORMAT,
+        'build_version': build_version,
+        'python': sys.version,
+        'sources': sources,
+    }
+
+def cache_is_fresh(cached_key, build_version, files):
+    """Whether a cache built with cached_key still matches the files on disk."""
+    expected = cache_key(build_version, None)
+    if any(cached_key.get(key) != value for key, value in expected.items() if key != 'sources'):
+        return False
+    sources = cached_key.get('sources') or {}
+    if set(sources) != set(files):
+        return False
+    for name, path in files.items():
+        stat = os.stat(path)
+        mtime_ns, size, digest = sources[name]
+        if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+            return False
+        if file_stamp(path)[2] != digest:
+            return False
+    return True
+
+def read_cache(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        # Missing, truncated or written by an incompatible version: rebuild
+        return None
+
+def write_cache(path, cached):
+    """Write the cache atomically; a read-only data directory just means no cache."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not write gazetteer cache {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def load_compiled(name, build, build_version, data_dir=GAZETTEER_DIR):
+    """
+    Return (compiled, info) for the gazetteers in data_dir.
+
+    build(gazetteers) must return a picklable dict, which is returned as
+    loaded. It is cached in data_dir/.cache/<name>.pickle. info reports
+    whether the cache was used, the file versions and the load time.
+    """
+    began = time.perf_counter()
+    files = gazetteer_files(data_dir)
+    path = os.path.join(data_dir, CACHE_DIRNAME, f'{name}.pickle')
+
+    cached = read_cache(path)
+    from_cache = bool(isinstance(cached, dict) and cache_is_fresh(cached.get('key', {}), build_version, files))
+    if not from_cache:
+        # Stamp the files before reading them, so an edit made meanwhile invalidates the cache
+        sources = {name: file_stamp(file_path) for name, file_path in files.items()}
+        gazetteers = load_gazetteers(data_dir)
+        compiled = build(gazetteers)
+        cached = {
+            'key': cache_key(build_version, sources),
+            'versions': {name: gazetteer['version'] for name, gazetteer in gazetteers.items()},
+            'compiled': compiled,
+        }
+        write_cache(path, cached)
+
+    info = {
+        'cached': from_cache,
+        'versions': cached['versions'],
+        'seconds': time.perf_counter() - began,
+    }
+    return cached['compiled'], info
@@ -0,0 +1,231 @@
+"""
+Script to index an account dump by ACCT_NO and look accounts up directly.
+
+The index records the byte offset of every line of the dump, keyed by a
+64-bit digest of its ACCT_NO. Digests and offsets are stored as two sorted
+arrays of unsigned 64-bit integers (16 bytes per row). Lookups memory-map
+the index and binary-search it in place, so only the pages the search
+touches are read, plus one seek into the dump, instead of a full-file pass.
+Looked-up accounts are re-classified with the same functions the
+extraction scripts use, and the reasons are shown.
+
+Usage:
+    python extract_index.py build "All Accts.txt"
+    python extract_index.py lookup "All Accts.txt" 1000012345 1000067890
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import array
+import struct
+import bisect
+import hashlib
+import argparse
+
+from extract_pipeline import field
+from extract_reader import (RowParser, fingerprint, is_compressed, iter_lines,
+                            last_line_end, read_header)
+from extract_verdicts import ACCOUNT_COLUMNS, classify_account
+
+# ============================================================================
+# INDEX FILE FORMAT
+# ============================================================================
+
+# Magic, then the length of a JSON metadata block, the metadata, and the
+# digest and offset arrays (count entries each, in metadata byte order).
+# The metadata is padded with spaces so the arrays start 8-byte aligned
+INDEX_MAGIC = b'ACCTIDX1'
+INDEX_HEADER = struct.Struct('<8sI')
+
+# Offsets are packed below the digest while sorting; dumps up to 256 TB
+OFFSET_BITS = 48
+
+def index_path(input_file):
+    """Path of the index kept next to the dump."""
+    return input_file + '.acctidx'
+
+def account_digest(account_no):
+    """64-bit digest of an account number, as an int."""
+    digest = hashlib.blake2b(account_no.strip().encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+# ============================================================================
+# BUILDING
+# ============================================================================
+
+def build_index(input_file, index_file=None):
+    """
+    Scan the dump once and write the ACCT_NO index.
+    Returns the number of indexed rows, or None if the dump cannot be indexed.
+    """
+    index_file = index_file or index_path(input_file)
+    if is_compressed(input_file):
+        print("Error: Indexing needs an uncompressed dump (offsets must be seekable)")
+        return
+
+    columns, data_start = read_header(input_file)
+    if 'ACCT_NO' not in columns:
+        print("Error: Required column not found - 'ACCT_NO' is not in list")
+        return
+    acct_idx = columns.index('ACCT_NO')
+    parser = RowParser(len(columns), [acct_idx])
+
+    print(f"Indexing file: {input_file}")
+    began = time.perf_counter()
+
+    # Stop at the last complete line, like incremental runs do
+    end = max(data_start, last_line_end(input_file))
+    entries = []
+    offset = data_start
+    for line in iter_lines(input_file, data_start, end):
+        account_no = field(parser(line), acct_idx)
+        if account_no:
+            entries.append(account_digest(account_no) << OFFSET_BITS | offset)
+        offset += len(line)
+    entries.sort()
+
+    mask = (1 << OFFSET_BITS) - 1
+    digests = array.array('Q', (entry >> OFFSET_BITS for entry in entries))
+    offsets = array.array('Q', (entry & mask for entry in entries))
+    del entries
+
+    meta = json.dumps({
+        'input_file': os.path.abspath(input_file),
+        'columns': columns,
+        'count': len(digests),
+        'byteorder': sys.byteorder,
+        'fingerprint': fingerprint(input_file, end),
+    }).encode('utf-8')
+    meta += b' ' * (-(INDEX_HEADER.size + len(meta)) % 8)
+
+    with open(index_file, 'wb') as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(meta)))
+        f.write(meta)
+        digests.tofile(f)
+        offsets.tofile(f)
+
+    elapsed = time.perf_counter() - began
+    print(f"Indexed {len(digests):,} rows in {elapsed:.2f}s")
+    print(f"Index file: {index_file} ({os.path.getsize(index_file) / (1024 * 1024):,.1f} MB)")
+    return len(digests)
+
+# ============================================================================
+# LOOKUP
+# ============================================================================
+
+def load_index(input_file, index_file=None):
+    """
+    Open the index of input_file. Returns (meta, digests, offsets), or None
+    if there is no index or the dump was rewritten since it was built.
+    digests and offsets are views of the memory-mapped file, read from disk
+    only where they are indexed.
+    """
+    index_file = index_file or index_path(input_file)
+    if not os.path.exists(index_file):
+        print(f"No index found at {index_file}, run: python extract_index.py build")
+        return
+
+    with open(index_file, 'rb') as f:
+        magic, meta_size = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        if magic != INDEX_MAGIC:
+            print(f"Error: {index_file} is not an account index")
+            return
+        meta = json.loads(f.read(meta_size))
+        # The views keep the map open after the file is closed
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    start = INDEX_HEADER.size + meta_size
+    size = meta['count'] * 8
+    digests = view[start:start + size].cast('Q')
+    offsets = view[start + size:start + 2 * size].cast('Q')
+    if meta['byteorder'] != sys.byteorder:
+        # Only an index copied from another machine; swap a copy in memory
+        digests, offsets = array.array('Q', digests), array.array('Q', offsets)
+        digests.byteswap()
+        offsets.byteswap()
+
+    indexed = meta['fingerprint']
+    if (os.path.getsize(input_file) < indexed['offset']
+            or fingerprint(input_file, indexed['offset']) != indexed):
+        print("The dump has changed since it was indexed, rebuild the index")
+        return
+    if os.path.getsize(input_file) > indexed['offset']:
+        print("Note: rows appended to the dump since indexing are not in the index")
+    return meta, digests, offsets
+
+def lookup_accounts(input_file, account_numbers, index_file=None):
+    """
+    Find the given accounts in the dump through the index and classify them.
+    Returns {account_no: [result, ...]} with one result per matching line
+    (an account can appear on several lines), or None if the index is unusable.
+    """
+    loaded = load_index(input_file, index_file)
+    if not loaded:
+        return
+    meta, digests, offsets = loaded
+
+    columns = meta['columns']
+    idx = {name: columns.index(name) if name in columns else None for name in ACCOUNT_COLUMNS}
+    parser = RowParser(len(columns), [i for i in idx.values() if i is not None])
+
+    results = {}
+    with open(input_file, 'rb') as f:
+        for account_no in account_numbers:
+            account_no = account_no.strip()
+            digest = account_digest(account_no)
+            matches = []
+            pos = bisect.bisect_left(digests, digest)
+            while pos < len(digests) and digests[pos] == digest:
+                f.seek(offsets[pos])
+                parts = parser(f.readline())
+                values = {name: field(parts, i) for name, i in idx.items()}
+                # Digests can collide, so confirm the account number itself
+                if values['ACCT_NO'] == account_no:
+                    matches.append(dict(values, offset=offsets[pos], **classify_account(values)))
+                pos += 1
+            results[account_no] = matches
+    return results
+
+def print_lookup(results):
+    for account_no, matches in results.items():
+        print(f"\n{'='*60}")
+        print(f"ACCOUNT {account_no}")
+        print(f"{'='*60}")
+        if not matches:
+            print("Not found in the index")
+            continue
+        for match in matches:
+            print(f"Line at byte:     {match['offset']:,}")
+            print(f"Customer name:    {match['CUST_NAME']}")
+            print(f"Email:            {match['E_MAIL']}"
+                  + ("" if match['valid_email'] else " (invalid, not extracted)"))
+            print(f"Phone:            {match['MOB_NUM']} -> {match['phone_status']}: {match['phone_reason']}")
+            print(f"Nationality:      {match['NATIONALITY']} | Geo: {match['CUS_GEO_LOCA']} "
+                  f"| State: {match['STATE_OF_RES']}")
+            print(f"Address:          {match['ADDRESS']}")
+            print(f"Location:         {match['location_status']}: {match['location_reason']}")
+            print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='index the dump by ACCT_NO')
+    build.add_argument('input')
+    build.add_argument('--index', help='index file (default: <input>.acctidx)')
+    lookup = commands.add_parser('lookup', help='look accounts up and re-classify them')
+    lookup.add_argument('input')
+    lookup.add_argument('accounts', nargs='+')
+    lookup.add_argument('--index', help='index file (default: <input>.acctidx)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_index(args.input, args.index)
+    else:
+        began = time.perf_counter()
+        results = lookup_accounts(args.input, args.accounts, args.index)
+        if results is not None:
+            print_lookup(results)
+            print(f"Looked up {len(results)} account(s) in {(time.perf_counter() - began) * 1000:.1f} ms")
@@ -0,0 +1,109 @@
+"""
+Per-stage instrumentation for extraction runs.
+
+When a run is profiled, the pipeline and the rules report into a Metrics
+object: wall time and call counts per stage (read/parse, email validation,
+is_nigerian_number, each priority level of determine_location_status,
+output writing), how many rows each priority level decided, and a histogram
+of detection_reason values. Results are exported as JSON, and an optional
+progress line is printed periodically while the run is going.
+"""
+
+import json
+import time
+
+# How often (in rows) the progress clock is checked
+PROGRESS_CHECK_ROWS = 8192
+
+def merge_counts(total, counts):
+    """Add nested dicts of counters (e.g. from one chunk or worker) into total."""
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            merge_counts(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+class Metrics:
+    """Collects stage timings, counters and throughput for one run."""
+
+    def __init__(self, progress_interval=None):
+        self.stages = {}
+        self.tables = {}
+        self.progress_interval = progress_interval
+        self.progress = []
+        # Rows and seconds per worker process, filled in by parallel runs
+        self.worker_stats = {}
+        self.started = time.perf_counter()
+        self.next_report = self.started + (progress_interval or 0)
+
+    def add(self, stage, seconds, calls=1):
+        """Record calls to a stage taking seconds of wall time in total."""
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = {'calls': calls, 'seconds': seconds}
+        else:
+            entry['calls'] += calls
+            entry['seconds'] += seconds
+
+    def count(self, table, key, n=1):
+        """Increment a histogram bucket, e.g. count('detection_reasons', reason)."""
+        counts = self.tables.setdefault(table, {})
+        counts[key] = counts.get(key, 0) + n
+
+    def timed(self, items, stage):
+        """Yield from an iterator, charging the time spent producing each item to stage."""
+        clock = time.perf_counter
+        items = iter(items)
+        while True:
+            start = clock()
+            item = next(items, None)
+            if item is None:
+                return
+            self.add(stage, clock() - start)
+            yield item
+
+    def tick(self, rows):
+        """Record throughput and print a progress line once per progress interval."""
+        if not self.progress_interval:
+            return
+        now = time.perf_counter()
+        if now < self.next_report:
+            return
+        elapsed = now - self.started
+        rate = rows / elapsed if elapsed else 0
+        self.progress.append({'seconds': round(elapsed, 3), 'rows': rows})
+        self.next_report = now + self.progress_interval
+        print(f"[progress] {rows:,} rows in {elapsed:,.1f}s ({rate:,.0f} rows/sec)")
+
+    def data(self):
+        """Stage timings and histograms as plain dicts, for merging across workers."""
+        return {'stages': self.stages, 'tables': self.tables}
+
+    def merge(self, data):
+        """Add the stage timings and histograms collected by a worker."""
+        merge_counts(self.stages, data['stages'])
+        merge_counts(self.tables, data['tables'])
+
+    def report(self, rows, **extra):
+        """Build the machine-readable report of the run."""
+        wall = time.perf_counter() - self.started
+        busy = sum(entry['seconds'] for entry in self.stages.values())
+        stages = {}
+        for stage, entry in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            stages[stage] = {
+                'calls': entry['calls'],
+                'seconds': round(entry['seconds'], 6),
+                'avg_us': round(entry['seconds'] / entry['calls'] * 1e6, 3) if entry['calls'] else 0,
+                'share': round(entry['seconds'] / busy, 4) if busy else 0,
+            }
+        tables = {name: dict(sorted(table.items(), key=lambda item: -item[1]))
+                  for name, table in self.tables.items()}
+        return dict(extra, rows=rows, wall_seconds=round(wall, 3),
+                    rows_per_sec=round(rows / wall, 1) if wall else 0,
+                    stages=stages, progress=self.progress, worker_stats=self.worker_stats,
+                    **tables)
+
+    def write_json(self, path, rows, **extra):
+        """Write the report to path."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(rows, **extra), f, indent=2)
@@ -5,129 +5,184 @@ Uses multiple detection methods for accuracy:
 2. CUS_GEO_LOCA column (geographic location)
 3. STATE_OF_RES column (state of residence)
 4. ADDRESS text analysis (checking for Nigerian locations)
+5. Fuzzy matching of place names written differently (PORTHARCOURT,
+   UNITEDKINGDOM) in undetermined addresses and in states not listed as
+   Nigerian; near misses (ABUJAH) are left UNKNOWN for review
 
-Data sourced from Wikipedia for accuracy:
+Data sourced from Wikipedia for accuracy (gazetteers/*.tsv):
 - All 36 Nigerian states + FCT
 - Major Nigerian cities
 - Common Nigerian address patterns
 """
 
-import re
-import csv
+import time
+from functools import lru_cache
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from extract_fuzzy import TrigramIndex
+from extract_gazetteer import load_compiled
+from extract_metrics import merge_counts
+from extract_pipeline import Rule, factorize, field, run_pipeline
 
 # ============================================================================
-# COMPREHENSIVE NIGERIAN LOCATION DATABASE (from Wikipedia)
+# NIGERIAN LOCATION DATABASE (from Wikipedia)
 # ============================================================================
 
-# All 36 Nigerian States + FCT
-NIGERIAN_STATES = {
-    'ABIA', 'ADAMAWA', 'AKWA IBOM', 'AKWA-IBOM', 'ANAMBRA', 'BAUCHI', 'BAYELSA',
-    'BENUE', 'BORNO', 'CROSS RIVER', 'CROSS-RIVER', 'DELTA', 'EBONYI', 'EDO',
-    'EKITI', 'ENUGU', 'GOMBE', 'IMO', 'JIGAWA', 'KADUNA', 'KANO', 'KATSINA',
-    'KEBBI', 'KOGI', 'KWARA', 'LAGOS', 'NASARAWA', 'NIGER', 'OGUN', 'ONDO',
-    'OSUN', 'OYO', 'PLATEAU', 'RIVERS', 'SOKOTO', 'TARABA', 'YOBE', 'ZAMFARA',
-    'FCT', 'FEDERAL CAPITAL TERRITORY', 'F.C.T', 'F.C.T.'
-}
-
-# Major Nigerian Cities (from Wikipedia List of populated places in Nigeria)
-NIGERIAN_CITIES = {
-    # Major cities
-    'LAGOS', 'ABUJA', 'KANO', 'IBADAN', 'PORT HARCOURT', 'BENIN CITY', 'MAIDUGURI',
-    'ZARIA', 'ABA', 'JOS', 'ILORIN', 'OYO', 'ENUGU', 'ABEOKUTA', 'ONITSHA',
-    'WARRI', 'SOKOTO', 'CALABAR', 'KATSINA', 'AKURE', 'BAUCHI', 'EBUTE METTA',
-    'OWERRI', 'UMUAHIA', 'MINNA', 'OSHOGBO', 'OSOGBO', 'OKENE', 'KADUNA', 'MAKURDI',
-    
-    # State capitals and other major cities
-    'ABAKALIKI', 'ADO EKITI', 'ADO-EKITI', 'AWKA', 'ASABA', 'YENAGOA', 'LOKOJA',
-    'LAFIA', 'DUTSE', 'GOMBE', 'BIRNIN KEBBI', 'JALINGO', 'GUSAU', 'DAMATURU',
-    'YOLA', 'UYO', 'IKEJA', 'POTISKUM', 'SULEJA', 'SAPELE', 'UGHELLI',
-    
-    # Other populated cities
-    'AFIKPO', 'AGBOR', 'AKPAWFU', 'AUCHI', 'AWGU', 'BIDA', 'BUGUMA', 'EDE',
-    'EKET', 'IFE', 'IKIRUN', 'IKOT ABASI', 'IKOT EKPENE', 'IWO', 'JEBBA',
-    'JIMETA', 'KABBA', 'KARU', 'KONTAGORA', 'KUTIGI', 'LEKKI', 'NNEWI',
-    'NSUKKA', 'OFFA', 'OGBOMOSO', 'OGAMINANA', 'OMU-ARAN', 'ONDO', 'ORON',
-    'OWO', 'ORLU', 'UROMI', 'WUKARI',
-    
-    # Lagos areas
-    'VICTORIA ISLAND', 'V.I', 'VI', 'IKOYI', 'LEKKI', 'AJAH', 'FESTAC',
-    'SURULERE', 'YABA', 'IKEJA', 'GBAGADA', 'MARYLAND', 'OJOTA', 'KETU',
-    'MILE 2', 'APAPA', 'ISOLO', 'MUSHIN', 'OSHODI', 'AGEGE', 'OGBA',
-    'IKOTUN', 'IYANA IPAJA', 'EGBEDA', 'ALIMOSHO', 'BADAGRY', 'EPE',
-    'IKORODU', 'SOMOLU', 'SHOMOLU', 'BARIGA', 'OGUDU', 'OJODU', 'BERGER',
-    'MAGODO', 'OMOLE', 'AGIDINGBI', 'DOPEMU', 'IDIMU', 'EJIGBO',
-    
-    # Abuja areas
-    'WUSE', 'GARKI', 'MAITAMA', 'ASOKORO', 'GWARINPA', 'KUBWA', 'NYANYA',
-    'KARU', 'LUGBE', 'JABI', 'UTAKO', 'GUDU', 'LIFECAMP', 'LIFE CAMP',
-    'GALADIMAWA', 'LOKOGOMA', 'APO', 'DURUMI', 'KUKWABA', 'JIKWOYI',
-    
-    # Other common areas
-    'IKOTA', 'VGC', 'AJAO ESTATE', 'DOLPHIN ESTATE', 'OPEBI', 'ALLEN',
-    'TOYIN', 'OREGUN', 'ILUPEJU', 'ANTHONY', 'PEDRO', 'PALMGROVE',
-    'FADEYI', 'ONIPANU', 'JIBOWU', 'EBUTE METTA', 'OYINGBO', 'IDDO',
-    'IJORA', 'ORILE', 'COSTAIN', 'LAWANSON', 'ITIRE', 'OJUELEGBA',
-}
-
-# Common Nigerian address keywords
-NIGERIAN_ADDRESS_KEYWORDS = {
-    'NIGERIA', 'NIGERIAN', 'NGN', 'NIG', 'N/A',
-    # Local Government Areas (LGA)
-    'LGA', 'LOCAL GOVERNMENT',
-    # Common street types
-    'CRESCENT', 'CLOSE', 'AVENUE', 'STREET', 'ROAD', 'DRIVE', 'WAY',
-    'ESTATE', 'LAYOUT', 'EXTENSION', 'PHASE',
-}
-
-# Foreign countries to detect (non-Nigerian)
-FOREIGN_COUNTRIES = {
-    # Major countries
-    'USA', 'U.S.A', 'UNITED STATES', 'AMERICA', 'AMERICAN',
-    'UK', 'U.K', 'UNITED KINGDOM', 'ENGLAND', 'BRITAIN', 'BRITISH', 'LONDON',
-    'CANADA', 'CANADIAN', 'TORONTO', 'VANCOUVER', 'MONTREAL', 'OTTAWA',
-    'GHANA', 'GHANAIAN', 'ACCRA', 'KUMASI',
-    'SOUTH AFRICA', 'JOHANNESBURG', 'CAPE TOWN', 'PRETORIA', 'DURBAN',
-    'DUBAI', 'UAE', 'U.A.E', 'UNITED ARAB EMIRATES', 'ABU DHABI', 'SHARJAH',
-    'CHINA', 'CHINESE', 'BEIJING', 'SHANGHAI', 'GUANGZHOU', 'SHENZHEN',
-    'INDIA', 'INDIAN', 'MUMBAI', 'DELHI', 'BANGALORE', 'CHENNAI',
-    'GERMANY', 'GERMAN', 'BERLIN', 'MUNICH', 'FRANKFURT', 'HAMBURG',
-    'FRANCE', 'FRENCH', 'PARIS', 'LYON', 'MARSEILLE',
-    'ITALY', 'ITALIAN', 'ROME', 'MILAN', 'NAPLES', 'TURIN',
-    'SPAIN', 'SPANISH', 'MADRID', 'BARCELONA', 'VALENCIA',
-    'NETHERLANDS', 'DUTCH', 'AMSTERDAM', 'ROTTERDAM', 'HAGUE',
-    'BELGIUM', 'BELGIAN', 'BRUSSELS', 'ANTWERP',
-    'SWITZERLAND', 'SWISS', 'ZURICH', 'GENEVA', 'BERN',
-    'AUSTRALIA', 'AUSTRALIAN', 'SYDNEY', 'MELBOURNE', 'BRISBANE', 'PERTH',
-    'NEW ZEALAND', 'AUCKLAND', 'WELLINGTON',
-    'JAPAN', 'JAPANESE', 'TOKYO', 'OSAKA', 'KYOTO',
-    'SINGAPORE', 'SINGAPOREAN',
-    'MALAYSIA', 'MALAYSIAN', 'KUALA LUMPUR',
-    'KENYA', 'KENYAN', 'NAIROBI', 'MOMBASA',
-    'CAMEROON', 'CAMEROONIAN', 'DOUALA', 'YAOUNDE',
-    'TOGO', 'TOGOLESE', 'LOME',
-    'BENIN REPUBLIC', 'BENINESE', 'COTONOU', 'PORTO NOVO',
-    'NIGER REPUBLIC', 'NIAMEY',
-    'CHAD', 'CHADIAN', 'NDJAMENA',
-    'EGYPT', 'EGYPTIAN', 'CAIRO', 'ALEXANDRIA',
-    'MOROCCO', 'MOROCCAN', 'CASABLANCA', 'RABAT',
-    'IRELAND', 'IRISH', 'DUBLIN',
-    'SCOTLAND', 'EDINBURGH', 'GLASGOW',
-    'WALES', 'CARDIFF',
-    'PORTUGAL', 'PORTUGUESE', 'LISBON',
-    'POLAND', 'POLISH', 'WARSAW', 'KRAKOW',
-    'RUSSIA', 'RUSSIAN', 'MOSCOW', 'SAINT PETERSBURG',
-    'TURKEY', 'TURKISH', 'ISTANBUL', 'ANKARA',
-    'SAUDI ARABIA', 'SAUDI', 'RIYADH', 'JEDDAH', 'MECCA',
-    'QATAR', 'QATARI', 'DOHA',
-    'KUWAIT', 'KUWAITI',
-    'BAHRAIN', 'BAHRAINI', 'MANAMA',
-    'OMAN', 'OMANI', 'MUSCAT',
-    'LEBANON', 'LEBANESE', 'BEIRUT',
-    'ISRAEL', 'ISRAELI', 'TEL AVIV', 'JERUSALEM',
-    'BRAZIL', 'BRAZILIAN', 'SAO PAULO', 'RIO DE JANEIRO',
-    'MEXICO', 'MEXICAN', 'MEXICO CITY',
-    'ARGENTINA', 'ARGENTINIAN', 'BUENOS AIRES',
-}
+# The gazetteers are data files in gazetteers/, one TERM<TAB>COUNTRY entry per
+# line (see extract_gazetteer.py):
+#   nigerian_states.tsv            all 36 Nigerian states + FCT
+#   nigerian_cities.tsv            major cities, Lagos and Abuja areas
+#   nigerian_address_keywords.tsv  common Nigerian address keywords
+#   foreign_locations.tsv          foreign countries, nationalities and cities
+# The matchers below are built from them once and cached on disk.
+
+# Bump when the matchers built from the gazetteers change, to invalidate caches
+MATCHER_VERSION = 2
+
+# ============================================================================
+# COMPILED MATCHERS
+# ============================================================================
+
+def build_prefix_map(terms):
+    """
+    Flatten terms into a {prefix: is_term} map holding every prefix of every
+    term: a character trie that pickles and loads as one plain dict, so a
+    cached matcher is ready to use without any compile step.
+    """
+    prefixes = {}
+    for term in terms:
+        for end in range(1, len(term)):
+            prefixes.setdefault(term[:end], False)
+        prefixes[term] = True
+    return prefixes
+
+def build_location_matcher(states, cities, foreign):
+    """
+    Build the prefix maps scan_locations() walks plus a term -> category map.
+    Returns (matcher, categories).
+
+    Every position of the text is tried, so overlapping hits are all found.
+    Short foreign terms (UK, USA, ...) only count as whole words and are
+    tried first; everything else goes into one shared map, from which the
+    longest term starting at the position is reported.
+    """
+    short_foreign = [term for term in foreign if len(term) <= 3]
+    long_foreign = [term for term in foreign if len(term) > 3]
+    # Only cities with 4+ chars are checked to avoid false positives
+    cities = [city for city in cities if len(city) >= 4]
+
+    # Lowest priority first so higher priorities overwrite shared terms
+    categories = {}
+    for category, terms in (('CITY', cities), ('STATE', states),
+                            ('NIGERIA', ['NIGERIA']), ('FOREIGN', long_foreign)):
+        for term in terms:
+            categories[term] = category
+
+    # The trie only reports the longest term at a position, so a term that
+    # starts with a foreign term must itself count as foreign (checking
+    # prefixes keeps this linear in the number of terms)
+    foreign_terms = set(long_foreign)
+    for term in categories:
+        if any(term[:end] in foreign_terms for end in range(4, len(term) + 1)):
+            categories[term] = 'FOREIGN'
+
+    matcher = {'short_foreign': build_prefix_map(short_foreign), 'terms': build_prefix_map(categories)}
+    return matcher, categories
+
+def build_fuzzy_index(states, cities, foreign):
+    """Trigram index over the state, city and foreign gazetteers for misspelled names."""
+    terms = {}
+    for category, names in (('FOREIGN', foreign), ('NIGERIA', ['NIGERIA']),
+                            ('STATE', states), ('CITY', cities)):
+        for name in names:
+            terms.setdefault(name, category)
+    return TrigramIndex(terms)
+
+def build_matchers(gazetteers):
+    """Build everything the detection functions need from the loaded gazetteer files."""
+    entries = {name: gazetteers[name]['entries'] for name in
+               ('nigerian_states', 'nigerian_cities', 'nigerian_address_keywords', 'foreign_locations')}
+    states, cities = entries['nigerian_states'], entries['nigerian_cities']
+    foreign = entries['foreign_locations']
+    matcher, categories = build_location_matcher(states, cities, foreign)
+
+    countries = {}
+    for name in ('nigerian_address_keywords', 'nigerian_cities', 'nigerian_states', 'foreign_locations'):
+        countries.update(entries[name])
+    return {
+        'sets': {name: set(terms) for name, terms in entries.items()},
+        'countries': countries,
+        'location_matcher': matcher,
+        'categories': categories,
+        'fuzzy_index': build_fuzzy_index(states, cities, foreign),
+    }
+
+MATCHERS, GAZETTEER_INFO = load_compiled('location_matchers', build_matchers, MATCHER_VERSION)
+
+NIGERIAN_STATES = MATCHERS['sets']['nigerian_states']
+NIGERIAN_CITIES = MATCHERS['sets']['nigerian_cities']
+NIGERIAN_ADDRESS_KEYWORDS = MATCHERS['sets']['nigerian_address_keywords']
+FOREIGN_COUNTRIES = MATCHERS['sets']['foreign_locations']
+# Gazetteer term -> ISO country code
+LOCATION_COUNTRIES = MATCHERS['countries']
+
+SHORT_FOREIGN_PREFIXES = MATCHERS['location_matcher']['short_foreign']
+TERM_PREFIXES = MATCHERS['location_matcher']['terms']
+LOCATION_CATEGORIES = MATCHERS['categories']
+FUZZY_INDEX = MATCHERS['fuzzy_index']
+# Fuzzy matches below this confidence stay UNKNOWN for review, in either
+# direction: one edit away from a gazetteer name is too often an unrelated
+# word (DURBAR ~ DURBAN, RIVER ~ RIVERS, BERGEN ~ BERGER), so only the exact
+# letters written differently (PORTHARCOURT, UNITEDKINGDOM) decide a row
+FUZZY_CONFIDENCE = 1.0
+
+def is_word_char(char):
+    """Letters, digits and underscore, as matched by \\w in a regex."""
+    return char.isalnum() or char == '_'
+
+def short_foreign_at(text, start):
+    """End of the longest short foreign term that is a whole word at text[start], or 0."""
+    if start and is_word_char(text[start - 1]):
+        return 0
+    found = 0
+    length = len(text)
+    for end in range(start + 1, length + 1):
+        is_term = SHORT_FOREIGN_PREFIXES.get(text[start:end])
+        if is_term is None:
+            break
+        if is_term and is_word_char(text[end - 1]) != (end < length and is_word_char(text[end])):
+            found = end
+    return found
+
+def scan_locations(text):
+    """Yield (category, term) for every gazetteer hit in text, in order of position."""
+    get = TERM_PREFIXES.get
+    length = len(text)
+    for start, char in enumerate(text):
+        # Short foreign terms first; they only count as whole words
+        if char in SHORT_FOREIGN_PREFIXES:
+            end = short_foreign_at(text, start)
+            if end:
+                yield 'FOREIGN', text[start:end]
+                continue
+        # Then the longest term of the shared map, walked one character at a time
+        found = 0
+        end = start + 1
+        while end <= length:
+            is_term = get(text[start:end])
+            if is_term is None:
+                break
+            if is_term:
+                found = end
+            end += 1
+        if found:
+            term = text[start:found]
+            yield LOCATION_CATEGORIES[term], term
 
 # ============================================================================
 # DETECTION FUNCTIONS
@@ -160,6 +215,15 @@ def is_nigerian_by_state(state):
         return None  # Unknown
     return st in NIGERIAN_STATES
 
+def find_location_hits(address):
+    """
+    Scan normalized address text once and return every gazetteer hit as a
+    list of (category, term) pairs, in order of position. Categories are
+    FOREIGN, NIGERIA, STATE and CITY; where terms of several categories start
+    at the same position the foreign one is reported.
+    """
+    return list(scan_locations(address))
+
 def is_nigerian_by_address(address):
     """
     Analyze address text to determine if it's Nigerian.
@@ -168,202 +232,348 @@ def is_nigerian_by_address(address):
     addr = normalize_text(address)
     if not addr or len(addr) < 5:
         return None  # Too short to determine
-    
-    # First check for explicit foreign country indicators
-    for foreign in FOREIGN_COUNTRIES:
-        if foreign in addr:
-            # Make sure it's a word boundary match for short terms
-            if len(foreign) <= 3:
-                if re.search(r'\b' + re.escape(foreign) + r'\b', addr):
-                    return False  # Definitely foreign
-            else:
-                return False  # Definitely foreign
-    
-    # Check for explicit "NIGERIA" mention
-    if 'NIGERIA' in addr:
-        return True
-    
-    # Check for Nigerian states in address
-    for state in NIGERIAN_STATES:
-        if state in addr:
-            return True
-    
-    # Check for Nigerian cities in address
-    for city in NIGERIAN_CITIES:
-        if len(city) >= 4:  # Only check cities with 4+ chars to avoid false positives
-            if city in addr:
-                return True
-    
-    return None  # Cannot determine
 
-def determine_location_status(nationality, geo_loc, state, address):
+    # A single pass over the address: any foreign indicator wins outright,
+    # otherwise any Nigerian state/city/"NIGERIA" mention makes it Nigerian
+    nigerian = None
+    for category, _ in scan_locations(addr):
+        if category == 'FOREIGN':
+            return False  # Definitely foreign
+        nigerian = True
+
+    return nigerian
+
+def fuzzy_location_match(text):
     """
-    Determine if a record is Nigerian or Non-Nigerian using all available data.
-    Returns: ('NIGERIAN', reason) or ('NON-NIGERIAN', reason) or ('UNKNOWN', reason)
+    Look for misspelled gazetteer names (PORTHARCOURT, ABUJAH) in a state or
+    address the exact checks left undetermined. Returns (status, reason)
+    with the match confidence, or None. A name found exactly as listed is
+    reported as an exact match; one below FUZZY_CONFIDENCE is UNKNOWN with
+    a review reason naming the candidate.
+    """
+    match = FUZZY_INDEX.best_match(text)
+    if not match:
+        return None
+    category, term, words, confidence = match
+    exact = words == term
+    if category == 'FOREIGN':
+        country = LOCATION_COUNTRIES.get(term, '??')
+        if exact:
+            return ('NON-NIGERIAN', f'Exact foreign location: {term} ({country})')
+        if confidence < FUZZY_CONFIDENCE:
+            # Left to the reviewers, with the candidate they should look at
+            return ('UNKNOWN', f'Fuzzy foreign location (review): {words} ~ {term} ({country}, {confidence:.2f})')
+        return ('NON-NIGERIAN', f'Fuzzy foreign location: {words} ~ {term} ({country}, {confidence:.2f})')
+    if exact:
+        return ('NIGERIAN', f'Exact Nigerian location: {term}')
+    if confidence < FUZZY_CONFIDENCE:
+        # A NIGERIAN label would take the row out of every output, so it is
+        # only given on the exact letters
+        return ('UNKNOWN', f'Fuzzy Nigerian location (review): {words} ~ {term} ({confidence:.2f})')
+    return ('NIGERIAN', f'Fuzzy Nigerian location: {words} ~ {term} ({confidence:.2f})')
+
+def classify_location_fields(nationality, geo_loc, state):
+    """
+    Apply the field-based priorities (nationality, geographic location, state)
+    to normalized values. Returns (decision, state_check) where decision is a
+    (status, reason template) pair, or None if the address must be checked.
+    Reason templates are filled in with the raw field values by the caller.
     """
     # Priority 1: Explicit nationality
     nat_check = is_nigerian_by_nationality(nationality)
     if nat_check == False:
-        return ('NON-NIGERIAN', f'Nationality: {nationality}')
+        return ('NON-NIGERIAN', 'Nationality: {nationality}'), None
     if nat_check == True:
-        return ('NIGERIAN', 'Nationality: NIGERIA')
-    
+        return ('NIGERIAN', 'Nationality: NIGERIA'), None
+
     # Priority 2: Geographic location
     geo_check = is_nigerian_by_geo_location(geo_loc)
     if geo_check == False:
-        return ('NON-NIGERIAN', f'Geographic Location: {geo_loc}')
+        return ('NON-NIGERIAN', 'Geographic Location: {geo_loc}'), None
     if geo_check == True:
-        return ('NIGERIAN', 'Geographic Location: NIGERIA')
-    
+        return ('NIGERIAN', 'Geographic Location: NIGERIA'), None
+
     # Priority 3: State of residence
     state_check = is_nigerian_by_state(state)
     if state_check == True:
-        return ('NIGERIAN', f'State: {state}')
-    
-    # Priority 4: Address analysis
-    addr_check = is_nigerian_by_address(address)
+        return ('NIGERIAN', 'State: {state}'), None
+
+    return None, state_check
+
+def location_by_fields(nationality, geo_loc, state):
+    """
+    Priorities 1-3 (nationality, geographic location, state).
+    Returns ((status, reason) or None, state check result for later use).
+    """
+    # Memoized on the normalized field values
+    decision, state_check = cached_location_fields(
+        normalize_text(nationality), normalize_text(geo_loc), normalize_text(state))
+    if decision:
+        status, reason = decision
+        return (status, reason.format(nationality=nationality, geo_loc=geo_loc, state=state)), None
+    return None, state_check
+
+def location_by_address(address, state, state_check):
+    """Priority 4 (address analysis) and the fallbacks, once priorities 1-3 were inconclusive."""
+    addr_check = cached_address_check(address)
     if addr_check == False:
         return ('NON-NIGERIAN', f'Foreign address detected')
     if addr_check == True:
         return ('NIGERIAN', 'Nigerian location in address')
-    
-    # If state was explicitly non-Nigerian
+
+    # If state was explicitly non-Nigerian, unless it names a Nigerian place
+    # other than a state (ABUJA) or writes one differently (LAGOS ST); a near
+    # miss on a Nigerian name goes to review
     if state_check == False:
+        fuzzy = cached_fuzzy_match(normalize_text(state))
+        if fuzzy and 'Nigerian location' in fuzzy[1]:
+            return fuzzy
         return ('NON-NIGERIAN', f'Non-Nigerian state: {state}')
-    
+
+    # Otherwise the row is undetermined: look for misspelled place names
+    fuzzy = cached_fuzzy_match(normalize_text(address))
+    if fuzzy:
+        return fuzzy
+
     return ('UNKNOWN', 'Insufficient data to determine')
 
+def determine_location_status(nationality, geo_loc, state, address):
+    """
+    Determine if a record is Nigerian or Non-Nigerian using all available data.
+    Returns: ('NIGERIAN', reason) or ('NON-NIGERIAN', reason) or ('UNKNOWN', reason)
+    """
+    decision, state_check = location_by_fields(nationality, geo_loc, state)
+    if decision:
+        return decision
+    return location_by_address(address, state, state_check)
+
+# Reason prefixes of the priority level that decided a record, for metrics
+PRIORITY_LEVELS = (
+    ('Nationality:', '1 nationality'),
+    ('Geographic Location:', '2 geo location'),
+    ('State:', '3 state'),
+    ('Fuzzy', '4b fuzzy match'),
+    ('Exact', '4b fuzzy match'),
+    ('Non-Nigerian state:', '5 non-nigerian state fallback'),
+    ('Insufficient', '6 undetermined'),
+)
+
+def priority_level(reason):
+    """Name the priority level of determine_location_status() that produced reason."""
+    for prefix, level in PRIORITY_LEVELS:
+        if reason.startswith(prefix):
+            return level
+    return '4 address'
+
 # ============================================================================
-# MAIN EXTRACTION FUNCTION
+# MEMOIZATION
 # ============================================================================
 
-def extract_non_nigerian_addresses(input_file, output_file):
+# Dumps repeat a small set of NATIONALITY / CUS_GEO_LOCA / STATE_OF_RES
+# values, and a customer's accounts usually share the same address
+LOCATION_CACHE_SIZE = 4096
+ADDRESS_CACHE_SIZE = 65536
+
+def configure_caches(location_size=LOCATION_CACHE_SIZE, address_size=ADDRESS_CACHE_SIZE):
+    """(Re)create the bounded LRU caches used by determine_location_status."""
+    global cached_location_fields, cached_address_check, cached_fuzzy_match, _reported_cache_info
+    cached_location_fields = lru_cache(maxsize=location_size)(classify_location_fields)
+    cached_address_check = lru_cache(maxsize=address_size)(is_nigerian_by_address)
+    cached_fuzzy_match = lru_cache(maxsize=address_size)(fuzzy_location_match)
+    _reported_cache_info = {}
+
+def take_cache_stats():
     """
-    Extract emails from accounts with non-Nigerian addresses.
+    Return hit/miss/eviction counters of the caches accumulated since the
+    previous call, so per-process counts can be summed across workers.
     """
-    non_ng_records = []
-    unknown_records = []
-    total_records = 0
-    records_with_email = 0
-    
-    with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-        # Read header
-        header = f.readline().strip()
-        columns = [col.strip('"') for col in header.split('|')]
-        
-        # Find column indices
-        try:
-            email_idx = columns.index('E_MAIL')
-            name_idx = columns.index('CUST_NAME')
-            acct_idx = columns.index('ACCT_NO')
-            nationality_idx = columns.index('NATIONALITY')
-            geo_loc_idx = columns.index('CUS_GEO_LOCA')
-            state_idx = columns.index('STATE_OF_RES')
-            address_idx = columns.index('ADDRESS')
-        except ValueError as e:
-            print(f"Error: Required column not found - {e}")
-            return
-        
-        print(f"Processing file: {input_file}")
+    stats = {}
+    for name, cache in (('location_cache', cached_location_fields),
+                        ('address_cache', cached_address_check),
+                        ('fuzzy_cache', cached_fuzzy_match)):
+        info = cache.cache_info()
+        # Every miss inserts an entry, so anything beyond the current size was evicted
+        current = {'hits': info.hits, 'misses': info.misses,
+                   'evictions': info.misses - info.currsize}
+        previous = _reported_cache_info.get(name, {})
+        stats[name] = {key: value - previous.get(key, 0) for key, value in current.items()}
+        _reported_cache_info[name] = current
+    return stats
+
+configure_caches()
+
+# ============================================================================
+# PIPELINE RULE
+# ============================================================================
+
+# A row of the address outputs, in CSV column order
+AddressRecord = namedtuple('AddressRecord', ['account_no', 'customer_name', 'email', 'nationality',
+                                             'geo_location', 'state', 'address', 'detection_reason'])
+
+class AddressRule(Rule):
+    """Flags accounts whose location data is non-Nigerian (or undeterminable)."""
+    name = 'address'
+    required_columns = ('E_MAIL', 'CUST_NAME', 'ACCT_NO', 'NATIONALITY',
+                        'CUS_GEO_LOCA', 'STATE_OF_RES', 'ADDRESS')
+    row_columns = ('E_MAIL', 'NATIONALITY', 'CUS_GEO_LOCA', 'STATE_OF_RES', 'ADDRESS')
+    fieldnames = AddressRecord._fields
+
+    def describe(self):
         print(f"Columns found: E_MAIL, CUST_NAME, ACCT_NO, NATIONALITY, CUS_GEO_LOCA, STATE_OF_RES, ADDRESS")
-        print("-" * 60)
-        
-        for line in f:
-            total_records += 1
-            
-            # Parse the line
-            parts = [p.strip('"') for p in line.strip().split('|')]
-            
-            if len(parts) <= max(email_idx, nationality_idx, geo_loc_idx, state_idx, address_idx):
-                continue
-            
-            email = parts[email_idx].strip()
-            name = parts[name_idx].strip()
-            acct = parts[acct_idx].strip()
-            nationality = parts[nationality_idx].strip()
-            geo_loc = parts[geo_loc_idx].strip()
-            state = parts[state_idx].strip()
-            address = parts[address_idx].strip()
-            
-            # Skip if no valid email
-            if not email or email in ['', 'nil', 'N/A', '.', '/', 'N/a']:
-                continue
-            
-            # Validate email format
-            if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-                continue
-            
-            records_with_email += 1
-            
-            # Determine location status
+
+    def classify(self, parts, email):
+        idx = self.idx
+        nationality = field(parts, idx['NATIONALITY'])
+        geo_loc = field(parts, idx['CUS_GEO_LOCA'])
+        state = field(parts, idx['STATE_OF_RES'])
+        address = field(parts, idx['ADDRESS'])
+
+        # Determine location status
+        if self.metrics:
+            status, reason = self.timed_location_status(nationality, geo_loc, state, address)
+        else:
             status, reason = determine_location_status(nationality, geo_loc, state, address)
-            
-            record = {
-                'account_no': acct,
-                'customer_name': name,
-                'email': email,
-                'nationality': nationality,
-                'geo_location': geo_loc,
-                'state': state,
-                'address': address[:100],  # Truncate long addresses
-                'detection_reason': reason
-            }
-            
-            if status == 'NON-NIGERIAN':
-                non_ng_records.append(record)
-            elif status == 'UNKNOWN':
-                unknown_records.append(record)
-    
-    # Write NON-NIGERIAN results
-    with open(output_file, 'w', encoding='utf-8', newline='') as f:
-        fieldnames = ['account_no', 'customer_name', 'email', 'nationality', 
-                      'geo_location', 'state', 'address', 'detection_reason']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(non_ng_records)
-    
-    # Write email-only file
-    email_only_file = output_file.replace('.csv', '_emails_only.txt')
-    with open(email_only_file, 'w', encoding='utf-8') as f:
-        for record in non_ng_records:
-            f.write(record['email'] + '\n')
-    
-    # Write UNKNOWN records for review
-    unknown_file = output_file.replace('.csv', '_unknown.csv')
-    with open(unknown_file, 'w', encoding='utf-8', newline='') as f:
-        fieldnames = ['account_no', 'customer_name', 'email', 'nationality', 
-                      'geo_location', 'state', 'address', 'detection_reason']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(unknown_records)
-    
-    # Print summary
-    print(f"\n{'='*60}")
-    print("EXTRACTION SUMMARY - NON-NIGERIAN ADDRESSES")
-    print(f"{'='*60}")
-    print(f"Total records processed:     {total_records:,}")
-    print(f"Records with valid email:    {records_with_email:,}")
-    print(f"NON-NIGERIAN records:        {len(non_ng_records):,}")
-    print(f"UNKNOWN records:             {len(unknown_records):,}")
-    print(f"\nOutput files:")
-    print(f"  - Non-Nigerian (full):   {output_file}")
-    print(f"  - Non-Nigerian (emails): {email_only_file}")
-    print(f"  - Unknown (for review):  {unknown_file}")
-    print(f"{'='*60}")
-    
-    # Print sample of extracted records
-    if non_ng_records:
-        print(f"\nSample NON-NIGERIAN records (first 15):")
-        print("-" * 100)
-        for i, record in enumerate(non_ng_records[:15], 1):
-            print(f"{i}. {record['email']}")
-            print(f"   Reason: {record['detection_reason']}")
-            print(f"   Nationality: {record['nationality']} | State: {record['state']}")
-            print()
-    else:
-        print("\nNo records with non-Nigerian addresses found.")
-    
-    return non_ng_records, unknown_records
+        if status not in ('NON-NIGERIAN', 'UNKNOWN'):
+            return None, None
+
+        return status, self.record(parts, email, nationality, geo_loc, state, address, reason)
+
+    def record(self, parts, email, nationality, geo_loc, state, address, reason):
+        # Long addresses are truncated
+        return AddressRecord(field(parts, self.idx['ACCT_NO']), field(parts, self.idx['CUST_NAME']), email,
+                             nationality, geo_loc, state, address[:100], reason)
+
+    def classify_batch(self, block, rows, emails):
+        """
+        determine_location_status() over whole columns. Priorities 1-3 only
+        depend on NATIONALITY, CUS_GEO_LOCA and STATE_OF_RES, which take few
+        distinct values, so each distinct combination is decided once and
+        the decision is spread back to its rows. Rows those fields settle as
+        Nigerian are dropped in bulk; only the rest are looked at one by one,
+        running the address checks where the fields were inconclusive.
+        """
+        metrics, clock = self.metrics, time.perf_counter
+        idx = self.idx
+        start = clock()
+        fields = [[field(block[i], idx[col]) for i in rows.tolist()]
+                  for col in ('NATIONALITY', 'CUS_GEO_LOCA', 'STATE_OF_RES')]
+        combo, combos = factorize(zip(*fields))
+        decisions = [location_by_fields(*values) for values in combos]
+        settled = np.array([decision is not None and decision[0] == 'NIGERIAN'
+                            for decision, _ in decisions], dtype=bool)
+        pending = np.flatnonzero(~settled[combo])
+        if metrics:
+            metrics.add('location: priorities 1-3 (nationality/geo/state)', clock() - start, len(rows))
+
+        results = []
+        levels = {}
+        if metrics:
+            for combo_id, count in enumerate(np.bincount(combo[settled[combo]], minlength=len(combos)).tolist()):
+                if count:
+                    reason = decisions[combo_id][0][1]
+                    levels[reason] = levels.get(reason, 0) + count
+
+        for position, combo_id in zip(pending.tolist(), combo[pending].tolist()):
+            decision, state_check = decisions[combo_id]
+            i = int(rows[position])
+            parts = block[i]
+            address = field(parts, idx['ADDRESS'])
+            nationality, geo_loc, state = combos[combo_id]
+            if not decision:
+                began = clock() if metrics else None
+                decision = location_by_address(address, state, state_check)
+                if metrics:
+                    metrics.add('location: priority 4 (address scan)', clock() - began)
+            status, reason = decision
+            if metrics:
+                levels[reason] = levels.get(reason, 0) + 1
+            if status in ('NON-NIGERIAN', 'UNKNOWN'):
+                results.append((i, status, self.record(parts, emails[i], nationality, geo_loc, state,
+                                                       address, reason)))
+
+        if metrics:
+            for reason, count in levels.items():
+                metrics.count('location_levels', priority_level(reason), count)
+                metrics.count('detection_reasons', reason, count)
+        return results
+
+    def timed_location_status(self, nationality, geo_loc, state, address):
+        """determine_location_status(), reporting each priority level to the metrics."""
+        metrics, clock = self.metrics, time.perf_counter
+        start = clock()
+        decision, state_check = location_by_fields(nationality, geo_loc, state)
+        metrics.add('location: priorities 1-3 (nationality/geo/state)', clock() - start)
+        if not decision:
+            start = clock()
+            decision = location_by_address(address, state, state_check)
+            metrics.add('location: priority 4 (address scan)', clock() - start)
+
+        status, reason = decision
+        metrics.count('location_levels', priority_level(reason))
+        metrics.count('detection_reasons', reason)
+        return decision
+
+    def collect_stats(self, counts):
+        merge_counts(counts, take_cache_stats())
+
+    def output_files(self, output_file):
+        return {
+            'NON-NIGERIAN': output_file,
+            'UNKNOWN': output_file.replace('.csv', '_unknown.csv'),
+        }
+
+    def print_summary(self, counts, outputs, samples):
+        non_ng = outputs['NON-NIGERIAN']
+        print(f"\n{'='*60}")
+        print("EXTRACTION SUMMARY - NON-NIGERIAN ADDRESSES")
+        print(f"{'='*60}")
+        print(f"Total records processed:     {counts['total_records']:,}")
+        print(f"Records with valid email:    {counts['records_with_email']:,}")
+        print(f"NON-NIGERIAN records:        {counts.get('NON-NIGERIAN', 0):,}")
+        print(f"UNKNOWN records:             {counts.get('UNKNOWN', 0):,}")
+        print(f"Duplicate emails removed:    {counts.get('duplicate_emails', 0):,}")
+        for name, label in (('location_cache', 'Location cache'), ('address_cache', 'Address cache'),
+                            ('fuzzy_cache', 'Fuzzy match cache')):
+            cache = counts.get(name)
+            if cache:
+                print(f"{label + ':':<29}{cache['hits']:,} hits, {cache['misses']:,} misses, "
+                      f"{cache['evictions']:,} evictions")
+        print(f"Gazetteers:                  {len(LOCATION_COUNTRIES):,} terms, "
+              f"{'cached' if GAZETTEER_INFO['cached'] else 'rebuilt'} in {GAZETTEER_INFO['seconds'] * 1000:.0f} ms")
+        print(f"\nOutput files:")
+        print(f"  - Non-Nigerian (full):   {non_ng.path}")
+        print(f"  - Non-Nigerian (emails): {non_ng.email_path}")
+        print(f"  - Unknown (for review):  {outputs['UNKNOWN'].path}")
+        print(f"{'='*60}")
+
+        # Print sample of extracted records
+        if samples:
+            print(f"\nSample NON-NIGERIAN records (first 15):")
+            print("-" * 100)
+            for i, record in enumerate(samples[:15], 1):
+                print(f"{i}. {record.email}")
+                print(f"   Reason: {record.detection_reason}")
+                print(f"   Nationality: {record.nationality} | State: {record.state}")
+                print()
+        else:
+            print("\nNo records with non-Nigerian addresses found.")
+
+# ============================================================================
+# MAIN EXTRACTION FUNCTION
+# ============================================================================
+
+def extract_non_nigerian_addresses(input_file, output_file, workers=1, incremental=False,
+                                   dedupe='digest', metrics_file=None, progress_interval=None,
+                                   compress=None, sqlite_file=None, batch_rows=None):
+    """
+    Extract emails from accounts with non-Nigerian addresses.
+    Rows are streamed to the output files; returns the run counters.
+    Options are passed on to run_pipeline(), which documents them.
+    """
+    return run_pipeline(input_file, [(AddressRule(), output_file)],
+                        workers=workers, incremental=incremental, dedupe=dedupe,
+                        metrics_file=metrics_file, progress_interval=progress_interval,
+                        compress=compress, sqlite_file=sqlite_file, batch_rows=batch_rows)
 
 if __name__ == "__main__":
     input_file = r"c:\Users\Wisdom\Desktop\MONEY-HIVE\All Accts.txt"
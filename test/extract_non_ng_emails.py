@@ -6,7 +6,146 @@ Nigerian numbers typically start with:
 """
 
 import re
-import csv
+import time
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from extract_pipeline import Rule, field, isin_small, run_pipeline, text_column
+
+# ============================================================================
+# CALLING CODE DATABASE (ITU-T E.164)
+# ============================================================================
+
+# Country calling codes -> ISO 3166 country code. Codes shared by several
+# countries map to the main one (1 covers the whole North American plan).
+CALLING_CODES = {
+    # Zone 1: North American Numbering Plan
+    '1': 'US',
+    # Zone 2: mostly Africa
+    '20': 'EG', '211': 'SS', '212': 'MA', '213': 'DZ', '216': 'TN', '218': 'LY',
+    '220': 'GM', '221': 'SN', '222': 'MR', '223': 'ML', '224': 'GN', '225': 'CI',
+    '226': 'BF', '227': 'NE', '228': 'TG', '229': 'BJ', '230': 'MU', '231': 'LR',
+    '232': 'SL', '233': 'GH', '234': 'NG', '235': 'TD', '236': 'CF', '237': 'CM',
+    '238': 'CV', '239': 'ST', '240': 'GQ', '241': 'GA', '242': 'CG', '243': 'CD',
+    '244': 'AO', '245': 'GW', '246': 'IO', '248': 'SC', '249': 'SD', '250': 'RW',
+    '251': 'ET', '252': 'SO', '253': 'DJ', '254': 'KE', '255': 'TZ', '256': 'UG',
+    '257': 'BI', '258': 'MZ', '260': 'ZM', '261': 'MG', '262': 'RE', '263': 'ZW',
+    '264': 'NA', '265': 'MW', '266': 'LS', '267': 'BW', '268': 'SZ', '269': 'KM',
+    '27': 'ZA', '290': 'SH', '291': 'ER', '297': 'AW', '298': 'FO', '299': 'GL',
+    # Zones 3-4: Europe
+    '30': 'GR', '31': 'NL', '32': 'BE', '33': 'FR', '34': 'ES', '350': 'GI',
+    '351': 'PT', '352': 'LU', '353': 'IE', '354': 'IS', '355': 'AL', '356': 'MT',
+    '357': 'CY', '358': 'FI', '359': 'BG', '36': 'HU', '370': 'LT', '371': 'LV',
+    '372': 'EE', '373': 'MD', '374': 'AM', '375': 'BY', '376': 'AD', '377': 'MC',
+    '378': 'SM', '379': 'VA', '380': 'UA', '381': 'RS', '382': 'ME', '383': 'XK',
+    '385': 'HR', '386': 'SI', '387': 'BA', '389': 'MK', '39': 'IT', '40': 'RO',
+    '41': 'CH', '420': 'CZ', '421': 'SK', '423': 'LI', '43': 'AT', '44': 'GB',
+    '45': 'DK', '46': 'SE', '47': 'NO', '48': 'PL', '49': 'DE',
+    # Zone 5: Central and South America
+    '500': 'FK', '501': 'BZ', '502': 'GT', '503': 'SV', '504': 'HN', '505': 'NI',
+    '506': 'CR', '507': 'PA', '508': 'PM', '509': 'HT', '51': 'PE', '52': 'MX',
+    '53': 'CU', '54': 'AR', '55': 'BR', '56': 'CL', '57': 'CO', '58': 'VE',
+    '590': 'GP', '591': 'BO', '592': 'GY', '593': 'EC', '594': 'GF', '595': 'PY',
+    '596': 'MQ', '597': 'SR', '598': 'UY', '599': 'CW',
+    # Zone 6: Southeast Asia and Oceania
+    '60': 'MY', '61': 'AU', '62': 'ID', '63': 'PH', '64': 'NZ', '65': 'SG',
+    '66': 'TH', '670': 'TL', '672': 'NF', '673': 'BN', '674': 'NR', '675': 'PG',
+    '676': 'TO', '677': 'SB', '678': 'VU', '679': 'FJ', '680': 'PW', '681': 'WF',
+    '682': 'CK', '683': 'NU', '685': 'WS', '686': 'KI', '687': 'NC', '688': 'TV',
+    '689': 'PF', '690': 'TK', '691': 'FM', '692': 'MH',
+    # Zone 7: Russia and Kazakhstan
+    '7': 'RU', '76': 'KZ', '77': 'KZ',
+    # Zone 8: East Asia
+    '81': 'JP', '82': 'KR', '84': 'VN', '850': 'KP', '852': 'HK', '853': 'MO',
+    '855': 'KH', '856': 'LA', '86': 'CN', '880': 'BD', '886': 'TW',
+    # Zone 9: West, Central and South Asia
+    '90': 'TR', '91': 'IN', '92': 'PK', '93': 'AF', '94': 'LK', '95': 'MM',
+    '960': 'MV', '961': 'LB', '962': 'JO', '963': 'SY', '964': 'IQ', '965': 'KW',
+    '966': 'SA', '967': 'YE', '968': 'OM', '970': 'PS', '971': 'AE', '972': 'IL',
+    '973': 'BH', '974': 'QA', '975': 'BT', '976': 'MN', '977': 'NP', '98': 'IR',
+    '992': 'TJ', '993': 'TM', '994': 'AZ', '995': 'GE', '996': 'KG', '998': 'UZ',
+}
+
+# Nigerian mobile numbers in local format: 070x, 071x, 080x, 081x, 090x, 091x
+NIGERIAN_MOBILE_PREFIXES = ['0' + a + b for a in '789' for b in '01']
+
+# Keys inside a trie node besides the digit characters
+COUNTRY = None      # country of the prefix ending at this node
+NEEDS_DIGIT = 0     # the prefix only counts if another digit follows it
+
+def build_prefix_trie():
+    """Build a digit trie mapping calling codes and Nigerian mobile prefixes to countries."""
+    trie = {}
+
+    def add(prefix, country, needs_digit=False):
+        node = trie
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+        node[COUNTRY] = country
+        if needs_digit:
+            node[NEEDS_DIGIT] = True
+
+    for code, country in CALLING_CODES.items():
+        add(code, country)
+    for prefix in NIGERIAN_MOBILE_PREFIXES:
+        add(prefix, 'NG', needs_digit=True)
+    return trie
+
+PREFIX_TRIE = build_prefix_trie()
+
+# resolve_country() never looks further into a number than the longest
+# prefix plus the digit a Nigerian local prefix needs after it
+PREFIX_KEY_LENGTH = max(len(prefix) for prefix in list(CALLING_CODES) + NIGERIAN_MOBILE_PREFIXES) + 1
+
+PHONE_PLACEHOLDERS = {'', '0', 'O', 'nil', 'N/A', '/'}
+PHONE_PUNCTUATION = str.maketrans('', '', '+- ')
+DIGIT_RUN = re.compile(r'\d{7,}')
+
+# ============================================================================
+# DETECTION FUNCTIONS
+# ============================================================================
+
+def resolve_country(phone):
+    """
+    Walk the prefix trie over a cleaned number and return the country of the
+    longest matching prefix, or None if no prefix matches.
+    """
+    node = PREFIX_TRIE
+    country = None
+    for i, digit in enumerate(phone):
+        node = node.get(digit)
+        if node is None:
+            break
+        if COUNTRY in node and (NEEDS_DIGIT not in node or phone[i + 1:i + 2].isdecimal()):
+            country = node[COUNTRY]
+    return country
+
+def classify_number(phone):
+    """
+    Classify a phone number in one pass.
+    Returns (is_nigerian, country) where is_nigerian is None for an
+    invalid/empty number, and country is an ISO code or None if unknown.
+    """
+    if not phone or phone.strip() in PHONE_PLACEHOLDERS:
+        return None, None  # Invalid/empty number - skip
+
+    # Clean the phone number
+    phone = phone.strip().translate(PHONE_PUNCTUATION)
+
+    # Check if it's a valid phone number (has 7+ consecutive digits)
+    if not (phone.isdecimal() and len(phone) >= 7) and not DIGIT_RUN.search(phone):
+        return None, None  # Not a valid phone number
+
+    country = resolve_country(phone)
+    return country == 'NG', country
+
+def classify_numbers(phones):
+    """Batch form of classify_number(): one (is_nigerian, country) per number."""
+    return [classify_number(phone) for phone in phones]
 
 def is_nigerian_number(phone):
     """
@@ -15,127 +154,136 @@ def is_nigerian_number(phone):
     - Start with 234 (country code)
     - Start with 0 followed by 70, 80, 81, 90, 91 (local format)
     """
-    if not phone or phone.strip() in ['', '0', 'O', 'nil', 'N/A', '/']:
-        return None  # Invalid/empty number - skip
-    
-    # Clean the phone number
-    phone = phone.strip().replace('+', '').replace('-', '').replace(' ', '')
-    
-    # Check if it's a valid phone number (has digits)
-    if not re.search(r'\d{7,}', phone):
-        return None  # Not a valid phone number
-    
-    # Nigerian patterns
-    nigerian_patterns = [
-        r'^234',           # International format with country code
-        r'^0[789][01]\d',  # Local format: 070x, 080x, 081x, 090x, 091x
-    ]
-    
-    for pattern in nigerian_patterns:
-        if re.match(pattern, phone):
-            return True
-    
-    return False
+    return classify_number(phone)[0]
+
+# ============================================================================
+# PIPELINE RULE
+# ============================================================================
+
+# A row of the phone output, in CSV column order
+PhoneRecord = namedtuple('PhoneRecord', ['account_no', 'customer_name', 'email', 'phone'])
+
+class PhoneRule(Rule):
+    """Flags accounts whose MOB_NUM is explicitly non-Nigerian."""
+    name = 'phone'
+    required_columns = ('E_MAIL', 'MOB_NUM')
+    optional_columns = ('CUST_NAME', 'ACCT_NO')
+    row_columns = ('E_MAIL', 'MOB_NUM')
+    fieldnames = PhoneRecord._fields
+
+    def describe(self):
+        print(f"Email column index: {self.idx['E_MAIL']}")
+        print(f"Mobile number column index: {self.idx['MOB_NUM']}")
+
+    def bind(self, columns):
+        super().bind(columns)
+        self.countries = {}
+
+    def classify(self, parts, email):
+        phone = field(parts, self.idx['MOB_NUM'])
+
+        # Check if phone number is non-Nigerian, and where it points to
+        if self.metrics:
+            start = time.perf_counter()
+            is_ng, country = classify_number(phone)
+            self.metrics.add('is_nigerian_number', time.perf_counter() - start)
+        else:
+            is_ng, country = classify_number(phone)
+        if is_ng is not None:
+            country = country or 'UNKNOWN'
+            self.countries[country] = self.countries.get(country, 0) + 1
+
+        if is_ng == False:  # Explicitly non-Nigerian (not None/invalid)
+            return 'NON-NIGERIAN', self.record(parts, email, phone)
+        return None, None
+
+    def record(self, parts, email, phone):
+        return PhoneRecord(field(parts, self.idx.get('ACCT_NO')), field(parts, self.idx.get('CUST_NAME')),
+                           email, phone)
+
+    def classify_batch(self, block, rows, emails):
+        """
+        classify_number() over a whole MOB_NUM column: placeholder, cleaning
+        and digit checks are column operations, and the country is resolved
+        once per distinct leading PREFIX_KEY_LENGTH characters.
+        """
+        start = time.perf_counter()
+        phones = text_column(block, self.idx['MOB_NUM'], rows)
+        cleaned = phones
+        for char in '+- ':
+            cleaned = np.strings.replace(cleaned, char, '')
 
-def extract_non_nigerian_emails(input_file, output_file):
+        placeholder = isin_small(phones, PHONE_PLACEHOLDERS)
+        digits_only = np.strings.isdecimal(cleaned) & (np.strings.str_len(cleaned) >= 7)
+        valid = ~placeholder & digits_only
+        # Anything else left needs the digit-run pattern
+        for i in np.flatnonzero(~placeholder & ~digits_only).tolist():
+            valid[i] = DIGIT_RUN.search(str(cleaned[i])) is not None
+
+        keys, first, inverse = np.unique(cleaned[valid].astype(f'U{PREFIX_KEY_LENGTH}'),
+                                         return_index=True, return_inverse=True)
+        key_countries = [resolve_country(key) for key in keys.tolist()]
+        non_ng = np.array([country != 'NG' for country in key_countries], dtype=bool)
+
+        # Country counters, in the order classify() would first have seen them
+        key_counts = np.bincount(inverse, minlength=len(keys))
+        for k in np.argsort(first, kind='stable').tolist():
+            country = key_countries[k] or 'UNKNOWN'
+            self.countries[country] = self.countries.get(country, 0) + int(key_counts[k])
+
+        matched = np.flatnonzero(valid)[non_ng[inverse]]
+        results = [(i, 'NON-NIGERIAN', self.record(block[i], emails[i], phone))
+                   for i, phone in zip(rows[matched].tolist(), phones[matched].tolist())]
+        if self.metrics:
+            self.metrics.add('is_nigerian_number', time.perf_counter() - start, len(rows))
+        return results
+
+    def collect_stats(self, counts):
+        countries = counts.setdefault('countries', {})
+        for country, count in self.countries.items():
+            countries[country] = countries.get(country, 0) + count
+        self.countries = {}
+
+    def print_summary(self, counts, outputs, samples):
+        output = outputs['NON-NIGERIAN']
+        print(f"\n{'='*50}")
+        print("EXTRACTION SUMMARY")
+        print(f"{'='*50}")
+        print(f"Total records processed: {counts['total_records']:,}")
+        print(f"Records with valid email: {counts['records_with_email']:,}")
+        print(f"Records with non-Nigerian numbers: {counts.get('NON-NIGERIAN', 0):,}")
+        print(f"Duplicate emails removed: {counts.get('duplicate_emails', 0):,}")
+        countries = sorted(counts.get('countries', {}).items(), key=lambda item: -item[1])
+        if countries:
+            print(f"\nValid numbers by country (top 10):")
+            for country, count in countries[:10]:
+                print(f"  - {country:<8} {count:,}")
+        print(f"\nOutput files:")
+        print(f"  - Full details: {output.path}")
+        print(f"  - Emails only: {output.email_path}")
+        print(f"{'='*50}")
+
+        # Print sample of extracted emails
+        if samples:
+            print(f"\nSample of extracted records (first 10):")
+            print("-" * 80)
+            for i, record in enumerate(samples[:10], 1):
+                print(f"{i}. {record.email} | Phone: {record.phone} | Name: {record.customer_name[:30]}")
+        else:
+            print("\nNo records with non-Nigerian phone numbers found.")
+
+def extract_non_nigerian_emails(input_file, output_file, workers=1, incremental=False,
+                                dedupe='digest', metrics_file=None, progress_interval=None,
+                                compress=None, sqlite_file=None, batch_rows=None):
     """
     Extract emails from accounts with non-Nigerian phone numbers.
+    Rows are streamed to the output files; returns the run counters.
+    Options are passed on to run_pipeline(), which documents them.
     """
-    non_ng_emails = []
-    total_records = 0
-    records_with_email = 0
-    non_ng_records = 0
-    
-    with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-        # Read header
-        header = f.readline().strip()
-        columns = [col.strip('"') for col in header.split('|')]
-        
-        # Find column indices
-        email_idx = columns.index('E_MAIL') if 'E_MAIL' in columns else None
-        mob_idx = columns.index('MOB_NUM') if 'MOB_NUM' in columns else None
-        name_idx = columns.index('CUST_NAME') if 'CUST_NAME' in columns else None
-        acct_idx = columns.index('ACCT_NO') if 'ACCT_NO' in columns else None
-        
-        if email_idx is None or mob_idx is None:
-            print("Error: Required columns not found!")
-            return
-        
-        print(f"Processing file: {input_file}")
-        print(f"Email column index: {email_idx}")
-        print(f"Mobile number column index: {mob_idx}")
-        print("-" * 50)
-        
-        for line in f:
-            total_records += 1
-            
-            # Parse the line
-            parts = [p.strip('"') for p in line.strip().split('|')]
-            
-            if len(parts) <= max(email_idx, mob_idx):
-                continue
-            
-            email = parts[email_idx].strip() if email_idx < len(parts) else ''
-            phone = parts[mob_idx].strip() if mob_idx < len(parts) else ''
-            name = parts[name_idx].strip() if name_idx and name_idx < len(parts) else ''
-            acct = parts[acct_idx].strip() if acct_idx and acct_idx < len(parts) else ''
-            
-            # Skip if no email
-            if not email or email in ['', 'nil', 'N/A', '.', '/']:
-                continue
-            
-            # Validate email format
-            if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-                continue
-                
-            records_with_email += 1
-            
-            # Check if phone number is non-Nigerian
-            is_ng = is_nigerian_number(phone)
-            
-            if is_ng == False:  # Explicitly non-Nigerian (not None/invalid)
-                non_ng_records += 1
-                non_ng_emails.append({
-                    'account_no': acct,
-                    'customer_name': name,
-                    'email': email,
-                    'phone': phone
-                })
-    
-    # Write results to output file
-    with open(output_file, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['account_no', 'customer_name', 'email', 'phone'])
-        writer.writeheader()
-        writer.writerows(non_ng_emails)
-    
-    # Also create a simple email-only file
-    email_only_file = output_file.replace('.csv', '_emails_only.txt')
-    with open(email_only_file, 'w', encoding='utf-8') as f:
-        for record in non_ng_emails:
-            f.write(record['email'] + '\n')
-    
-    # Print summary
-    print(f"\n{'='*50}")
-    print("EXTRACTION SUMMARY")
-    print(f"{'='*50}")
-    print(f"Total records processed: {total_records:,}")
-    print(f"Records with valid email: {records_with_email:,}")
-    print(f"Records with non-Nigerian numbers: {non_ng_records:,}")
-    print(f"\nOutput files:")
-    print(f"  - Full details: {output_file}")
-    print(f"  - Emails only: {email_only_file}")
-    print(f"{'='*50}")
-    
-    # Print sample of extracted emails
-    if non_ng_emails:
-        print(f"\nSample of extracted records (first 10):")
-        print("-" * 80)
-        for i, record in enumerate(non_ng_emails[:10], 1):
-            print(f"{i}. {record['email']} | Phone: {record['phone']} | Name: {record['customer_name'][:30]}")
-    else:
-        print("\nNo records with non-Nigerian phone numbers found.")
-    
-    return non_ng_emails
+    return run_pipeline(input_file, [(PhoneRule(), output_file)],
+                        workers=workers, incremental=incremental, dedupe=dedupe,
+                        metrics_file=metrics_file, progress_interval=progress_interval,
+                        compress=compress, sqlite_file=sqlite_file, batch_rows=batch_rows)
 
 if __name__ == "__main__":
     input_file = r"c:\Users\Wisdom\Desktop\MONEY-HIVE\All Accts.txt"
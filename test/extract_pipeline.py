@@ -0,0 +1,732 @@
+"""
+Single-pass extraction pipeline shared by the extraction scripts.
+
+The account dump is read once and every record is handed to a list of
+pluggable rules (phone number classification, address classification, ...).
+Each rule decides which output bucket a record belongs to, and matching rows
+are streamed straight to their CSV / emails-only files instead of being
+collected in memory, so memory stays flat no matter how many records match.
+"""
+
+import os
+import re
+import csv
+import json
+import math
+import time
+import hashlib
+from operator import itemgetter
+from collections import deque
+from multiprocessing import Pool
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from extract_metrics import Metrics, PROGRESS_CHECK_ROWS, merge_counts
+from extract_reader import (RowParser, fingerprint, is_compressed, iter_line_batches, iter_lines,
+                            last_line_end, open_text, read_header, split_ranges)
+from extract_store import SqliteStore
+
+# ============================================================================
+# SHARED PARSING HELPERS
+# ============================================================================
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Placeholder values found in the E_MAIL column
+EMAIL_PLACEHOLDERS = {'', 'nil', 'N/A', '.', '/', 'N/a'}
+
+SAMPLE_SIZE = 15
+
+# Target size of a byte range handed to a worker in parallel mode
+CHUNK_BYTES = 16 * 1024 * 1024
+# Decompressed lines per task when a compressed dump is classified in parallel
+STREAM_BATCH_BYTES = 4 * 1024 * 1024
+# Rows per block in columnar batch mode
+BATCH_ROWS = 10000
+# Records buffered by a sink before they are written out in one batch
+SINK_BATCH_ROWS = 256
+
+def field(parts, idx):
+    """Return the stripped field at idx, or '' if the column/field is missing."""
+    if idx is None or idx >= len(parts):
+        return ''
+    return parts[idx].strip()
+
+def clean_email(email):
+    """Return the email if it is a usable address, otherwise ''."""
+    if not email or email in EMAIL_PLACEHOLDERS:
+        return ''
+    if not EMAIL_PATTERN.match(email):
+        return ''
+    return email
+
+# ============================================================================
+# EMAIL DEDUPLICATION
+# ============================================================================
+
+# Default sizing of the Bloom filter mode (~18 MB of bits)
+BLOOM_CAPACITY = 10_000_000
+BLOOM_ERROR_RATE = 0.001
+
+def normalize_email(email):
+    """Case-folded form used to spot the same address on several accounts."""
+    return email.strip().casefold()
+
+def email_digest(email, size=8):
+    """Fixed-size digest of a normalized email."""
+    return hashlib.blake2b(normalize_email(email).encode('utf-8'), digest_size=size).digest()
+
+class DigestSet:
+    """Set of seen emails, stored as 64-bit digests instead of the strings."""
+
+    def __init__(self):
+        self.seen = set()
+
+    def add(self, email):
+        """Record email; returns False if it was already seen."""
+        digest = int.from_bytes(email_digest(email), 'big')
+        if digest in self.seen:
+            return False
+        self.seen.add(digest)
+        return True
+
+class BloomFilter:
+    """
+    Fixed-memory set of seen emails. Memory does not grow with the dump, at
+    the cost of dropping about error_rate of unique emails once capacity
+    emails have been added.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, email):
+        """Record email; returns False if it was (probably) already seen."""
+        digest = email_digest(email, 16)
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        new = False
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % self.size
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                new = True
+        return new
+
+# Ways of deduplicating the emails-only files (None keeps every line)
+DEDUPE_MODES = {'digest': DigestSet, 'bloom': BloomFilter}
+
+# ============================================================================
+# RULES AND SINKS
+# ============================================================================
+
+class Rule:
+    """
+    Base class for a classification rule run by the pipeline.
+
+    Subclasses list the columns they need, and implement classify() which
+    returns (bucket, record) for a row with a valid email, or (None, None)
+    if the row does not belong in any output. Records are namedtuples whose
+    fields are the rule's fieldnames, in CSV column order.
+    """
+    name = 'rule'
+    required_columns = ()
+    optional_columns = ()
+    # Columns that must be present in a row for it to be considered at all
+    row_columns = ()
+    fieldnames = ()
+    # Bucket whose emails also go to the _emails_only.txt file
+    primary_bucket = 'NON-NIGERIAN'
+    # Metrics object to report stage timings to, when the run is profiled
+    metrics = None
+
+    def bind(self, columns):
+        """Resolve column indices from the header. Raises ValueError if missing."""
+        for col in self.required_columns:
+            if col not in columns:
+                raise ValueError(f"'{col}' is not in list")
+        self.idx = {col: columns.index(col)
+                    for col in self.required_columns + self.optional_columns
+                    if col in columns}
+        self.min_fields = max(self.idx[col] for col in self.row_columns)
+
+    def describe(self):
+        """Print which columns the rule is using."""
+
+    def classify(self, parts, email):
+        raise NotImplementedError
+
+    def classify_batch(self, block, rows, emails):
+        """
+        Columnar form of classify() for batch mode: block is a list of parsed
+        rows, rows the indices in it with a valid email (emails[i]). Returns
+        (index, bucket, record) for each row landing in a bucket, in row
+        order. Rules override this with NumPy column operations; by default
+        each row goes through classify().
+        """
+        results = []
+        for i in rows.tolist():
+            bucket, record = self.classify(block[i], emails[i])
+            if bucket:
+                results.append((i, bucket, record))
+        return results
+
+    def collect_stats(self, counts):
+        """Add rule-specific counters (e.g. cache statistics) to counts."""
+
+    def output_files(self, output_file):
+        """Map each bucket to the CSV file it is written to."""
+        return {self.primary_bucket: output_file}
+
+    def print_summary(self, counts, outputs, samples):
+        raise NotImplementedError
+
+def emails_only_path(output_file):
+    """Path of the emails-only companion file for a CSV output."""
+    return output_file.replace('.csv', '_emails_only.txt')
+
+class CsvSink:
+    """
+    Streams records to a CSV file and, optionally, an emails-only file.
+    If seen is given (a DigestSet or BloomFilter), each email is written to
+    the emails-only file only the first time it appears. Records are
+    buffered and written SINK_BATCH_ROWS at a time.
+    """
+
+    def __init__(self, path, fieldnames, email_path=None, append=False, seen=None):
+        self.path = path
+        self.email_path = email_path
+        self.seen = seen
+        self.duplicates = 0
+        self.rows = []
+        self.emails = []
+        mode = 'a' if append else 'w'
+
+        # Emails already written by earlier runs count as seen
+        if seen is not None and append and email_path:
+            with open_text(email_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    seen.add(line.rstrip('\n'))
+
+        # .gz/.bz2/.xz paths are compressed as they are written
+        self.file = open_text(path, mode, encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        if not append:
+            self.writer.writerow(fieldnames)
+        self.email_file = open_text(email_path, mode, encoding='utf-8') if email_path else None
+
+    def write(self, record):
+        self.rows.append(record)
+        if self.email_file:
+            if self.seen is None or self.seen.add(record.email):
+                self.emails.append(record.email)
+            else:
+                self.duplicates += 1
+        if len(self.rows) >= SINK_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Write out the buffered records."""
+        self.writer.writerows(self.rows)
+        self.rows = []
+        if self.emails:
+            self.email_file.write('\n'.join(self.emails) + '\n')
+            self.emails = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        if self.email_file:
+            self.email_file.close()
+
+def sink_paths(rule, output_file):
+    """Yield (bucket, csv path, emails-only path or None) for each output of a rule."""
+    for bucket, path in rule.output_files(output_file).items():
+        email_path = emails_only_path(path) if bucket == rule.primary_bucket else None
+        yield bucket, path, email_path
+
+def open_sinks(rule, output_file, append=False, dedupe='digest'):
+    """Create one sink per bucket of a rule."""
+    sinks = {}
+    for bucket, path, email_path in sink_paths(rule, output_file):
+        seen = DEDUPE_MODES[dedupe]() if dedupe and email_path else None
+        sinks[bucket] = CsvSink(path, rule.fieldnames, email_path, append, seen)
+    return sinks
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def read_rows(input_file, parser, start, end=None):
+    """Yield the parsed fields of each line between two byte offsets."""
+    for line in iter_lines(input_file, start, end):
+        yield parser(line)
+
+def projected_columns(rules, email_idx):
+    """Indices of every column some rule (or the email check) reads."""
+    needed = {email_idx}
+    for rule in rules:
+        needed.update(rule.idx.values())
+    return needed
+
+def classify_rows(rows, rules, email_idx, counts, metrics=None):
+    """
+    Run every rule over a stream of parsed rows.
+    Yields (rule, bucket, record) for each record that lands in a bucket and
+    keeps the per-rule counters in counts up to date. If metrics is given,
+    email validation time and progress are reported to it.
+    """
+    clock = time.perf_counter
+    for parts in rows:
+        counts['total_records'] += 1
+        email = None
+
+        if metrics and counts['total_records'] % PROGRESS_CHECK_ROWS == 0:
+            metrics.tick(counts['total_records'])
+
+        for rule in rules:
+            if len(parts) <= rule.min_fields:
+                continue
+
+            # Email is validated once per row and shared by all rules
+            if email is None:
+                if metrics:
+                    start = clock()
+                    email = clean_email(parts[email_idx].strip())
+                    metrics.add('email validation', clock() - start)
+                else:
+                    email = clean_email(parts[email_idx].strip())
+            if not email:
+                continue
+
+            rule_counts = counts[rule.name]
+            rule_counts['records_with_email'] += 1
+
+            bucket, record = rule.classify(parts, email)
+            if bucket:
+                rule_counts[bucket] = rule_counts.get(bucket, 0) + 1
+                yield rule, bucket, record
+
+    for rule in rules:
+        rule.collect_stats(counts[rule.name])
+
+def new_counts(rules):
+    """Fresh counter structure for a pipeline run."""
+    counts = {'total_records': 0}
+    for rule in rules:
+        counts[rule.name] = {'records_with_email': 0}
+    return counts
+
+# ============================================================================
+# COLUMNAR BATCH MODE
+# ============================================================================
+
+def batch_mode_available():
+    """Batch mode needs NumPy 2 (variable-width strings and np.strings)."""
+    return np is not None and hasattr(np, 'strings') and hasattr(np.dtypes, 'StringDType')
+
+def text_column(block, idx, rows):
+    """field() of every row in rows as a NumPy string array (NULs and all kept)."""
+    return np.array([field(block[i], idx) for i in rows.tolist()], dtype=np.dtypes.StringDType())
+
+def isin_small(values, choices):
+    """np.isin() for a handful of choices: one vectorized comparison each, no sorting."""
+    return np.logical_or.reduce([values == choice for choice in choices])
+
+def factorize(keys):
+    """
+    Number distinct keys in order of first appearance.
+    Returns (codes as an int array, distinct keys). Dict lookups beat
+    sorting for the low-cardinality string columns of a dump.
+    """
+    ids = {}
+    codes = np.fromiter((ids.setdefault(key, len(ids)) for key in keys), dtype=np.int64)
+    return codes, list(ids)
+
+def iter_blocks(rows, size):
+    """Group a stream of parsed rows into lists of up to size rows."""
+    block = []
+    for parts in rows:
+        block.append(parts)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+def block_emails(block, email_idx, rows):
+    """
+    clean_email() of the given rows of a block, as a list over the whole
+    block ('' where the row has no usable address). The pattern has to run
+    on each value; converting the column to an array first costs more than
+    the vectorized placeholder check saves.
+    """
+    emails = [''] * len(block)
+    for i in rows.tolist():
+        emails[i] = clean_email(block[i][email_idx].strip())
+    return emails
+
+def classify_blocks(rows, rules, email_idx, counts, metrics=None, batch_rows=BATCH_ROWS):
+    """
+    Columnar form of classify_rows(): rows are gathered into blocks of
+    batch_rows and the email check and each rule's classify_batch() run
+    over whole columns. Yields the same (rule, bucket, record) stream in the
+    same order, and keeps the same counters.
+    """
+    clock = time.perf_counter
+    shortest = min(rule.min_fields for rule in rules)
+    for block in iter_blocks(rows, batch_rows):
+        counts['total_records'] += len(block)
+        if metrics:
+            metrics.tick(counts['total_records'])
+
+        lengths = np.fromiter(map(len, block), dtype=np.int64, count=len(block))
+        start = clock()
+        # Email is validated once per row and shared by all rules
+        emails = block_emails(block, email_idx, np.flatnonzero(lengths > shortest))
+        has_email = np.fromiter(map(bool, emails), dtype=bool, count=len(block))
+        if metrics:
+            metrics.add('email validation', clock() - start, len(block))
+
+        matches = []
+        for position, rule in enumerate(rules):
+            rows_for_rule = np.flatnonzero(has_email & (lengths > rule.min_fields))
+            rule_counts = counts[rule.name]
+            rule_counts['records_with_email'] += len(rows_for_rule)
+            for i, bucket, record in rule.classify_batch(block, rows_for_rule, emails):
+                rule_counts[bucket] = rule_counts.get(bucket, 0) + 1
+                matches.append((i, position, bucket, record))
+
+        # Back to row order, rules in their usual order within a row
+        if len(rules) > 1:
+            matches.sort(key=itemgetter(0, 1))
+        for _, position, bucket, record in matches:
+            yield rules[position], bucket, record
+
+    for rule in rules:
+        rule.collect_stats(counts[rule.name])
+
+def classify_stream(rows, rules, email_idx, counts, metrics=None, batch_rows=None):
+    """classify_rows(), or classify_blocks() when batch_rows is set."""
+    if batch_rows:
+        return classify_blocks(rows, rules, email_idx, counts, metrics, batch_rows)
+    return classify_rows(rows, rules, email_idx, counts, metrics)
+
+# ============================================================================
+# PARALLEL MODE
+# ============================================================================
+
+def classify_range(task):
+    """
+    Worker entry point: classify every line of one chunk of the dump, given
+    as an (input_file, start, end) byte range or as a list of raw lines.
+    Returns the matches as (rule position, bucket, record) in file order,
+    along with the chunk counters, timing for throughput reporting and, if
+    the run is profiled, the chunk's stage metrics.
+    """
+    source, rules, email_idx, parser, profile, batch_rows = task
+    began = time.perf_counter()
+    counts = new_counts(rules)
+    position = {rule.name: i for i, rule in enumerate(rules)}
+
+    metrics = Metrics() if profile else None
+    for rule in rules:
+        rule.metrics = metrics
+
+    if isinstance(source, list):
+        rows = map(parser, source)
+    else:
+        input_file, start, end = source
+        rows = read_rows(input_file, parser, start, end)
+    if metrics:
+        rows = metrics.timed(rows, 'read/parse')
+    matches = [(position[rule.name], bucket, record)
+               for rule, bucket, record in classify_stream(rows, rules, email_idx, counts, metrics,
+                                                           batch_rows)]
+
+    metrics_data = metrics.data() if metrics else None
+    return matches, counts, os.getpid(), time.perf_counter() - began, metrics_data
+
+def classify_parallel(input_file, start, end, rules, email_idx, parser, counts, workers,
+                      metrics=None, batch_rows=None):
+    """
+    Classify the dump between two byte offsets using a pool of worker processes.
+    Ranges are processed concurrently but yielded back in file order, so the
+    output is identical to a serial run. Yields (rule, bucket, record).
+    A compressed dump cannot be split by offset, so it is decompressed here
+    and handed to the workers as batches of lines instead.
+    Worker stage metrics are merged into metrics, if given. batch_rows
+    switches the workers to columnar batch mode.
+    """
+    profile = metrics is not None
+    if is_compressed(input_file):
+        tasks = ((lines, rules, email_idx, parser, profile, batch_rows)
+                 for lines in iter_line_batches(input_file, start, STREAM_BATCH_BYTES, end))
+    else:
+        if end is None:
+            end = os.path.getsize(input_file)
+        # At least a few ranges per worker so small dumps still spread out
+        per_worker = (end - start) // (workers * 4) + 1
+        ranges = split_ranges(input_file, start, min(CHUNK_BYTES, per_worker), end)
+        tasks = (((input_file, begin, end), rules, email_idx, parser, profile, batch_rows)
+                 for begin, end in ranges)
+    worker_stats = {}
+
+    with Pool(workers) as pool:
+        for matches, chunk_counts, pid, elapsed, chunk_metrics in bounded_imap(
+                pool, classify_range, tasks, workers * 2):
+            merge_counts(counts, chunk_counts)
+            stats = worker_stats.setdefault(pid, {'rows': 0, 'seconds': 0.0})
+            stats['rows'] += chunk_counts['total_records']
+            stats['seconds'] += elapsed
+            if metrics:
+                metrics.merge(chunk_metrics)
+                metrics.tick(counts['total_records'])
+            for i, bucket, record in matches:
+                yield rules[i], bucket, record
+
+    print_worker_stats(worker_stats)
+    if metrics:
+        metrics.worker_stats = {str(pid): stats for pid, stats in worker_stats.items()}
+
+def bounded_imap(pool, func, tasks, window):
+    """
+    Like pool.imap(), but only keeps window tasks in flight, so a lazily
+    produced task stream (batches of decompressed lines) is not read ahead
+    into memory all at once. Results come back in task order.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def print_worker_stats(worker_stats):
+    """Print rows/sec achieved by each worker process."""
+    print(f"\nWorker throughput ({len(worker_stats)} workers):")
+    for i, (pid, stats) in enumerate(sorted(worker_stats.items()), 1):
+        rate = stats['rows'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"  - Worker {i} (pid {pid}): {stats['rows']:,} rows in "
+              f"{stats['seconds']:.2f}s ({rate:,.0f} rows/sec)")
+
+# ============================================================================
+# INCREMENTAL MODE
+# ============================================================================
+
+def checkpoint_path(output_file):
+    """Path of the checkpoint kept next to the first output of a run."""
+    if is_compressed(output_file):
+        output_file = os.path.splitext(output_file)[0]
+    return output_file.replace('.csv', '_checkpoint.json')
+
+def output_paths(jobs):
+    """Every CSV and emails-only file the jobs write to."""
+    return [path for rule, output_file in jobs
+            for _, csv_path, email_path in sink_paths(rule, output_file)
+            for path in (csv_path, email_path) if path]
+
+def load_checkpoint(path, input_file, columns, jobs):
+    """
+    Return the saved checkpoint if the run can resume from it: same input
+    header, rules and outputs, every output still on disk, and the input only
+    appended to since. Returns None if a full rescan is needed.
+    Rows a failed run appended after the checkpoint was saved are cut off
+    the outputs again (by truncating them to their checkpointed sizes);
+    compressed outputs cannot be cut, so those need a full rescan.
+    """
+    if not os.path.exists(path):
+        print("Incremental mode: no checkpoint found, running a full scan")
+        return None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+
+    outputs = output_paths(jobs)
+    sizes = checkpoint.get('output_sizes') or {}
+    if (checkpoint.get('columns') != columns
+            or checkpoint.get('jobs') != [[rule.name, output_file] for rule, output_file in jobs]
+            or sorted(sizes) != sorted(outputs)
+            or not all(os.path.exists(path) for path in outputs)):
+        print("Incremental mode: checkpoint does not match this run, running a full scan")
+        return None
+
+    offset = checkpoint['fingerprint']['offset']
+    if os.path.getsize(input_file) < offset or fingerprint(input_file, offset) != checkpoint['fingerprint']:
+        print("Incremental mode: input file was rewritten, running a full scan")
+        return None
+
+    changed = [path for path in outputs if os.path.getsize(path) != sizes[path]]
+    if any(is_compressed(path) or os.path.getsize(path) < sizes[path] for path in changed):
+        print("Incremental mode: outputs changed since the checkpoint, running a full scan")
+        return None
+    for path in changed:
+        os.truncate(path, sizes[path])
+    if changed:
+        print(f"Incremental mode: dropped rows written after the checkpoint from {len(changed)} output file(s)")
+
+    print(f"Incremental mode: resuming at byte {offset:,}")
+    return checkpoint
+
+def save_checkpoint(path, input_file, offset, columns, jobs, counts):
+    """Record how far the input was processed, the size of each output and the running counters."""
+    checkpoint = {
+        'input_file': input_file,
+        'columns': columns,
+        'jobs': [[rule.name, output_file] for rule, output_file in jobs],
+        'fingerprint': fingerprint(input_file, offset),
+        'output_sizes': {path: os.path.getsize(path) for path in output_paths(jobs)},
+        'counts': counts,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_pipeline(input_file, jobs, workers=1, incremental=False, dedupe='digest',
+                 metrics_file=None, progress_interval=None, compress=None, sqlite_file=None,
+                 batch_rows=None):
+    """
+    Read input_file once and apply each (rule, output_file) job to every record.
+    The dump is memory-mapped and only the columns the rules use are decoded;
+    .gz/.bz2/.xz dumps are streamed through a background decompression thread.
+    Matching rows are streamed to the rule's output files as they are found.
+    Returns the counters of the run, or None if a required column is missing.
+
+    Options (the extract_* wrappers take the same ones):
+      workers            > 1 splits the dump into newline-aligned byte ranges
+                         classified in a process pool; results keep file order
+      incremental        only process rows appended since the last checkpointed
+                         run, appending to the existing outputs; counters carry over
+      dedupe             how repeated emails are dropped from the emails-only
+                         files: 'digest' (exact), 'bloom' (fixed memory) or None
+      metrics_file       profile the run stage by stage and write the results
+                         there as JSON
+      progress_interval  print a progress line every this many seconds
+      compress           'gz', 'bz2' or 'xz': write every output compressed, with
+                         that suffix added to its name
+      sqlite_file        also load matching records into this SQLite database as
+                         a new run (see extract_store.py)
+      batch_rows         classify rows in blocks of this many with NumPy column
+                         operations (same results, needs NumPy 2)
+    """
+    rules = [rule for rule, _ in jobs]
+    if compress:
+        jobs = [(rule, f"{output_file}.{compress}") for rule, output_file in jobs]
+
+    # Read header
+    columns, data_start = read_header(input_file)
+
+    # Find column indices
+    try:
+        email_idx = columns.index('E_MAIL')
+        for rule in rules:
+            rule.bind(columns)
+    except ValueError as e:
+        print(f"Error: Required column not found - {e}")
+        return
+
+    print(f"Processing file: {input_file}")
+    for rule in rules:
+        rule.describe()
+    print("-" * 60)
+
+    if incremental and is_compressed(input_file):
+        # Checkpoints identify the dump by raw byte offsets, which a compressed file lacks
+        print("Incremental mode needs an uncompressed dump, processing the whole file")
+        incremental = False
+
+    checkpoint_file = checkpoint_path(jobs[0][1])
+    start, end, checkpoint = data_start, None, None
+    if incremental:
+        checkpoint = load_checkpoint(checkpoint_file, input_file, columns, jobs)
+        if checkpoint:
+            start = checkpoint['fingerprint']['offset']
+        # Stop at the last complete line; the rest is picked up next run
+        end = max(start, last_line_end(input_file))
+    elif os.path.exists(checkpoint_file):
+        # The outputs are about to be rewritten, so the old checkpoint is stale
+        os.remove(checkpoint_file)
+
+    if batch_rows and not batch_mode_available():
+        print("Batch mode needs NumPy 2 (pip install numpy), classifying row by row")
+        batch_rows = None
+
+    # Only the columns the rules read are ever decoded
+    parser = RowParser(len(columns), projected_columns(rules, email_idx))
+    counts = checkpoint['counts'] if checkpoint else new_counts(rules)
+    resumed_rows = counts['total_records']
+    sinks = {rule.name: open_sinks(rule, output_file, bool(checkpoint), dedupe)
+             for rule, output_file in jobs}
+    samples = {rule.name: [] for rule in rules}
+
+    metrics = None
+    if metrics_file or progress_interval:
+        metrics = Metrics(progress_interval)
+    for rule in rules:
+        rule.metrics = metrics
+
+    if workers > 1:
+        matches = classify_parallel(input_file, start, end, rules, email_idx, parser, counts, workers,
+                                    metrics, batch_rows)
+    else:
+        rows = read_rows(input_file, parser, start, end)
+        if metrics:
+            rows = metrics.timed(rows, 'read/parse')
+        matches = classify_stream(rows, rules, email_idx, counts, metrics, batch_rows)
+
+    store = SqliteStore(sqlite_file, input_file, start, incremental) if sqlite_file else None
+
+    clock = time.perf_counter
+    try:
+        for rule, bucket, record in matches:
+            if metrics:
+                began = clock()
+                sinks[rule.name][bucket].write(record)
+                metrics.add('write', clock() - began)
+            else:
+                sinks[rule.name][bucket].write(record)
+            if store:
+                store.write(rule.name, bucket, record)
+            if bucket == rule.primary_bucket and len(samples[rule.name]) < SAMPLE_SIZE:
+                samples[rule.name].append(record)
+    except BaseException:
+        if store:
+            store.close()
+        raise
+    finally:
+        for rule_sinks in sinks.values():
+            for sink in rule_sinks.values():
+                sink.close()
+
+    for rule in rules:
+        duplicates = sum(sink.duplicates for sink in sinks[rule.name].values())
+        counts[rule.name]['duplicate_emails'] = counts[rule.name].get('duplicate_emails', 0) + duplicates
+
+    if incremental:
+        save_checkpoint(checkpoint_file, input_file, end, columns, jobs, counts)
+
+    if store:
+        store.finish(counts)
+        if metrics:
+            metrics.add('write (sqlite)', store.seconds, store.rows)
+
+    if metrics_file:
+        metrics.write_json(metrics_file, counts['total_records'] - resumed_rows,
+                           input_file=input_file, workers=workers, start_offset=start)
+        print(f"Metrics written to: {metrics_file}")
+
+    for rule in rules:
+        rule_counts = dict(counts[rule.name], total_records=counts['total_records'])
+        rule.print_summary(rule_counts, sinks[rule.name], samples[rule.name])
+
+    return counts
@@ -0,0 +1,275 @@
+"""
+Readers for the pipe-delimited account dump.
+
+The dump is memory-mapped and handled as bytes. Each line is only split as
+far as the last column the rules need, and only those columns are decoded,
+so the dozens of other fields on a row are never turned into strings.
+Quoted fields that contain '|' are split correctly.
+
+Dumps archived as .gz, .bz2 or .xz are read directly as a stream: a
+background thread decompresses blocks into a bounded queue while the
+caller parses the previous ones. Offsets into a compressed dump count
+decompressed bytes.
+"""
+
+import os
+import bz2
+import gzip
+import lzma
+import mmap
+import queue
+import hashlib
+import threading
+
+# ============================================================================
+# LINE PARSING
+# ============================================================================
+
+def decode_line(line):
+    """Decode raw dump bytes the same way the text-mode readers did."""
+    return line.decode('utf-8', errors='ignore')
+
+def parse_line(line):
+    """Split a pipe-delimited dump line into its (unquoted) fields."""
+    return [p.strip('"') for p in line.strip().split('|')]
+
+def split_quoted(line):
+    """
+    Split a dump line on '|', keeping '|' inside double-quoted fields.
+    A quoted field ends at the first '"|' (or a '"' ending the line); a
+    field that opens a quote but never closes it is split normally.
+    """
+    parts = []
+    pos = 0
+    while True:
+        if line.startswith('"', pos):
+            close = line.find('"|', pos + 1)
+            if close != -1:
+                parts.append(line[pos:close + 1])
+                pos = close + 2
+                continue
+            if line.endswith('"') and len(line) - 1 > pos:
+                parts.append(line[pos:])
+                return parts
+
+        end = line.find('|', pos)
+        if end == -1:
+            parts.append(line[pos:])
+            return parts
+        parts.append(line[pos:end])
+        pos = end + 1
+
+class RowParser:
+    """
+    Parses raw dump lines, decoding only the projected column indices.
+
+    The returned list has the same length semantics as parse_line() for every
+    column up to the last projected one. Projected fields are unquoted str
+    values; the others are left as undecoded bytes and must not be used.
+    """
+
+    def __init__(self, n_columns, needed):
+        self.n_columns = n_columns
+        self.needed = sorted(set(needed))
+        self.last = self.needed[-1]
+
+    def __call__(self, line):
+        line = line.strip()
+
+        # More separators than header columns means a quoted field holds a '|'
+        if line.count(b'|') >= self.n_columns:
+            return [p.strip('"') for p in split_quoted(decode_line(line).strip())]
+
+        parts = line.split(b'|', self.last + 1)
+        # Without a trailing remainder the last piece is the line's final field
+        final = len(parts) - 1 if len(parts) <= self.last + 1 else None
+        for i in self.needed:
+            if i >= len(parts):
+                break
+            value = decode_line(parts[i])
+            # Match str.strip() of the whole line on the first and last field
+            if i == 0:
+                value = value.lstrip()
+            if i == final:
+                value = value.rstrip()
+            parts[i] = value.strip('"')
+        return parts
+
+# ============================================================================
+# FILE ACCESS
+# ============================================================================
+
+def read_header(input_file):
+    """Return the header columns and the byte offset where the data starts."""
+    with open_binary(input_file) as f:
+        columns = parse_line(decode_line(f.readline()))
+        return columns, f.tell()
+
+def iter_lines(input_file, start, end=None):
+    """Yield the raw lines of input_file between two byte offsets via mmap."""
+    if is_compressed(input_file):
+        yield from stream_lines(input_file, start, end)
+        return
+
+    with open(input_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.seek(start)
+            pos = start
+            while pos < end:
+                line = mm.readline()
+                if not line:
+                    break
+                pos += len(line)
+                yield line
+
+def split_ranges(input_file, start, chunk_bytes, end=None):
+    """
+    Split input_file between byte offsets start and end into ranges of about
+    chunk_bytes each. Every boundary is moved forward to the next newline so
+    no line is split between two ranges.
+    """
+    size = os.path.getsize(input_file) if end is None else end
+    ranges = []
+    with open(input_file, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def last_line_end(input_file):
+    """Offset just past the last newline, so a half-written final line is left alone."""
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.rfind(b'\n') + 1
+
+# ============================================================================
+# COMPRESSED DUMPS
+# ============================================================================
+
+# File suffix -> module providing open() for that compression format
+COMPRESSION_FORMATS = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
+
+# Decompressed bytes per block handed from the background thread
+STREAM_BLOCK_BYTES = 1024 * 1024
+# Blocks decompressed ahead of the parser (bounds the buffer's memory)
+STREAM_QUEUE_BLOCKS = 8
+
+def compression_of(path):
+    """The compression module for path's suffix, or None for plain files."""
+    return COMPRESSION_FORMATS.get(os.path.splitext(path)[1].lower())
+
+def is_compressed(path):
+    return compression_of(path) is not None
+
+def open_binary(path):
+    """Open a dump for reading bytes, decompressing on the fly if needed."""
+    codec = compression_of(path)
+    return codec.open(path, 'rb') if codec else open(path, 'rb')
+
+def open_text(path, mode, **kwargs):
+    """Open an output file in text mode, compressing it if its suffix asks for it."""
+    codec = compression_of(path)
+    if codec:
+        return codec.open(path, mode + 't', **kwargs)
+    return open(path, mode, **kwargs)
+
+def _put(blocks, item, stop):
+    """Put item on the queue, giving up if the reader has gone away."""
+    while not stop.is_set():
+        try:
+            blocks.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+def _decompress_blocks(input_file, start, end, blocks, stop):
+    """Background thread: decompress input_file from start to end into blocks."""
+    try:
+        with open_binary(input_file) as f:
+            f.seek(start)
+            pos = start
+            while not stop.is_set():
+                size = STREAM_BLOCK_BYTES if end is None else min(STREAM_BLOCK_BYTES, end - pos)
+                block = f.read(size) if size > 0 else b''
+                if not block:
+                    break
+                pos += len(block)
+                _put(blocks, block, stop)
+        _put(blocks, None, stop)
+    except Exception as e:
+        _put(blocks, e, stop)
+
+def stream_lines(input_file, start, end=None):
+    """
+    Yield the raw lines of a compressed dump between two decompressed offsets.
+    Decompression runs in a background thread (zlib, bz2 and lzma release the
+    GIL), so inflating the next blocks overlaps with parsing the current one.
+    """
+    blocks = queue.Queue(maxsize=STREAM_QUEUE_BLOCKS)
+    stop = threading.Event()
+    thread = threading.Thread(target=_decompress_blocks, daemon=True,
+                              args=(input_file, start, end, blocks, stop))
+    thread.start()
+
+    tail = b''
+    try:
+        while True:
+            block = blocks.get()
+            if block is None:
+                break
+            if isinstance(block, Exception):
+                raise block
+            lines = (tail + block).split(b'\n')
+            tail = lines.pop()
+            yield from lines
+        if tail:
+            yield tail
+    finally:
+        stop.set()
+        thread.join()
+
+def iter_line_batches(input_file, start, batch_bytes, end=None):
+    """Group the lines of input_file into lists of about batch_bytes each."""
+    batch, size = [], 0
+    for line in iter_lines(input_file, start, end):
+        batch.append(line)
+        size += len(line) + 1
+        if size >= batch_bytes:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+# ============================================================================
+# FINGERPRINTS
+# ============================================================================
+
+# Bytes hashed at the start of the file and just before the checkpoint offset
+FINGERPRINT_BYTES = 64 * 1024
+
+def fingerprint(input_file, offset):
+    """
+    Identify the first offset bytes of input_file. If the file has only been
+    appended to since, the same offset gives the same fingerprint; if it was
+    rewritten, the head or the block before the offset will differ.
+    """
+    with open(input_file, 'rb') as f:
+        head = f.read(min(offset, FINGERPRINT_BYTES))
+        tail_start = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(tail_start)
+        tail = f.read(offset - tail_start)
+    return {
+        'offset': offset,
+        'head_sha1': hashlib.sha1(head).hexdigest(),
+        'tail_sha1': hashlib.sha1(tail).hexdigest(),
+    }
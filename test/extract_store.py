@@ -0,0 +1,116 @@
+"""
+SQLite results store for extraction runs.
+
+Besides the CSV / emails-only files, classified records can be loaded into a
+local SQLite database so follow-up questions are answered with indexed
+queries instead of rescanning the outputs. Every execution adds a row to the
+runs table, and its records are tagged with that run_id in the results
+table, so runs can be compared with each other (e.g. accounts whose status
+changed since an earlier run).
+
+Example queries:
+    SELECT status, COUNT(*) FROM results WHERE run_id = 3 GROUP BY status;
+    SELECT * FROM results WHERE account_no = '1000012345' ORDER BY run_id;
+"""
+
+import json
+import time
+import sqlite3
+from datetime import datetime
+
+# Records inserted per transaction
+SQLITE_BATCH_ROWS = 50000
+
+RESULT_COLUMNS = ('account_no', 'customer_name', 'email', 'phone', 'nationality',
+                  'geo_location', 'state', 'address', 'detection_reason')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    input_file TEXT NOT NULL,
+    start_offset INTEGER NOT NULL,
+    incremental INTEGER NOT NULL,
+    total_records INTEGER,
+    counts TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    rule TEXT NOT NULL,
+    status TEXT NOT NULL,
+    account_no TEXT,
+    customer_name TEXT,
+    email TEXT,
+    phone TEXT,
+    nationality TEXT,
+    geo_location TEXT,
+    state TEXT,
+    address TEXT,
+    detection_reason TEXT
+);
+"""
+
+# Created after the first bulk load, which is faster than maintaining them row by row
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_results_account_no ON results(account_no);
+CREATE INDEX IF NOT EXISTS idx_results_email ON results(email);
+CREATE INDEX IF NOT EXISTS idx_results_status ON results(status);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id, rule);
+"""
+
+class SqliteStore:
+    """Buffers classified records and inserts them into SQLite in large batches."""
+
+    def __init__(self, path, input_file, start_offset=0, incremental=False):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (started_at, input_file, start_offset, incremental) VALUES (?, ?, ?, ?)',
+                (now(), input_file, start_offset, int(incremental)))
+        self.run_id = cursor.lastrowid
+        self.insert = (f"INSERT INTO results (run_id, rule, status, {', '.join(RESULT_COLUMNS)}) "
+                       f"VALUES ({', '.join('?' * (len(RESULT_COLUMNS) + 3))})")
+        self.batch = []
+        self.rows = 0
+        self.seconds = 0.0
+
+    def write(self, rule, status, record):
+        self.batch.append((self.run_id, rule, status) + tuple(getattr(record, col, None) for col in RESULT_COLUMNS))
+        if len(self.batch) >= SQLITE_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered records in one transaction."""
+        if not self.batch:
+            return
+        began = time.perf_counter()
+        with self.conn:
+            self.conn.executemany(self.insert, self.batch)
+        self.seconds += time.perf_counter() - began
+        self.rows += len(self.batch)
+        self.batch = []
+
+    def finish(self, counts):
+        """Flush, record the run's counters, make sure the indexes exist and close."""
+        self.flush()
+        began = time.perf_counter()
+        with self.conn:
+            self.conn.executescript(INDEXES)
+            self.conn.execute('UPDATE runs SET finished_at = ?, total_records = ?, counts = ? WHERE run_id = ?',
+                              (now(), counts['total_records'], json.dumps(counts), self.run_id))
+        self.seconds += time.perf_counter() - began
+        self.close()
+        print(f"\nResults database: {self.path} (run {self.run_id}, {self.rows:,} records, "
+              f"{self.seconds:.2f}s writing)")
+
+    def close(self):
+        """Close the connection; a run left without finished_at did not complete."""
+        self.conn.close()
+
+def now():
+    return datetime.now().isoformat(timespec='seconds')
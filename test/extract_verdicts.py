@@ -0,0 +1,44 @@
+"""
+Account-level verdicts: the phone and location classifications of one
+account, each with the reason behind it. Shared by the lookup tool
+(extract_index.py), the classification service and the customer rollup.
+"""
+
+from extract_pipeline import clean_email
+from extract_non_ng_emails import classify_number
+from extract_non_ng_address import determine_location_status
+
+# Dump columns the verdicts of an account are computed from
+ACCOUNT_COLUMNS = ('ACCT_NO', 'CUST_NAME', 'E_MAIL', 'MOB_NUM', 'NATIONALITY',
+                   'CUS_GEO_LOCA', 'STATE_OF_RES', 'ADDRESS')
+
+PHONE_STATUSES = {None: 'INVALID', True: 'NIGERIAN', False: 'NON-NIGERIAN'}
+
+def phone_verdict(phone):
+    """(status, country, reason) for a MOB_NUM value."""
+    is_ng, country = classify_number(phone)
+    if is_ng is None:
+        reason = 'Invalid or placeholder number'
+    elif is_ng:
+        reason = 'Nigerian number'
+    else:
+        reason = f"Non-Nigerian number ({country or 'unknown country'})"
+    return PHONE_STATUSES[is_ng], country, reason
+
+def location_verdict(values):
+    """(status, reason) for the location columns of an account."""
+    return determine_location_status(values['NATIONALITY'], values['CUS_GEO_LOCA'],
+                                     values['STATE_OF_RES'], values['ADDRESS'])
+
+def classify_account(values):
+    """Re-run both classifications on one account and explain the outcome."""
+    phone_status, phone_country, phone_reason = phone_verdict(values['MOB_NUM'])
+    location_status, location_reason = location_verdict(values)
+    return {
+        'valid_email': clean_email(values['E_MAIL'].strip()),
+        'phone_status': phone_status,
+        'phone_country': phone_country,
+        'phone_reason': phone_reason,
+        'location_status': location_status,
+        'location_reason': location_reason,
+    }
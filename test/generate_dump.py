@@ -0,0 +1,178 @@
+"""
+Script to generate a synthetic account dump shaped like "All Accts.txt".
+
+Rows are pipe-delimited with quoted fields and carry the columns the
+extraction scripts read (ACCT_NO, CUST_NAME, E_MAIL, MOB_NUM, NATIONALITY,
+CUS_GEO_LOCA, STATE_OF_RES, ADDRESS) among other core-banking columns.
+The mix of Nigerian / foreign / unknown customers and the share of dirty
+values are configurable, so benchmarks can be run on production-sized data.
+
+Usage:
+    python generate_dump.py synthetic_accts.txt --rows 1000000
+    python generate_dump.py synthetic_accts.txt --rows 10000000 --foreign 0.1 --dirty 0.2
+"""
+
+import random
+import argparse
+
+# ============================================================================
+# COLUMNS AND VALUE POOLS
+# ============================================================================
+
+COLUMNS = [
+    'BRA_CODE', 'ACCT_NO', 'CUST_NO', 'CUST_NAME', 'ACCT_TYPE', 'CUR_CODE',
+    'E_MAIL', 'MOB_NUM', 'TEL_NUM', 'NATIONALITY', 'CUS_GEO_LOCA',
+    'STATE_OF_RES', 'ADDRESS', 'DATE_OPEN', 'DATE_OF_BIRTH', 'SEX', 'BVN',
+    'ACCT_STATUS', 'CUST_TYPE', 'OCCUPATION',
+]
+
+FIRST_NAMES = ['ADEBAYO', 'CHIOMA', 'EMEKA', 'FATIMA', 'IBRAHIM', 'NGOZI', 'OLUWASEUN',
+               'TUNDE', 'AISHA', 'CHINEDU', 'JOHN', 'MARY', 'DAVID', 'SARAH', 'KWAME',
+               'AMA', 'WANJIRU', 'OTIENO', 'JAMES', 'GRACE']
+LAST_NAMES = ['OKAFOR', 'ADEYEMI', 'BELLO', 'EZE', 'MUSA', 'OKONKWO', 'ADEBANJO',
+              'SMITH', 'JOHNSON', 'MENSAH', 'OWUSU', 'KAMAU', 'OCHIENG', 'BROWN',
+              'WILLIAMS', 'ABUBAKAR', 'NWOSU', 'OLAWALE', 'IBEKWE', 'UCHE']
+EMAIL_DOMAINS = ['yahoo.com', 'gmail.com', 'hotmail.com', 'outlook.com', 'yahoo.co.uk',
+                 'mail.com', 'company.com.ng', 'icloud.com']
+
+NIGERIAN_STATES = ['LAGOS', 'FCT', 'RIVERS', 'OYO', 'KANO', 'ENUGU', 'DELTA', 'EDO',
+                   'OGUN', 'KADUNA', 'ANAMBRA', 'ABIA']
+NIGERIAN_STREETS = ['ALLEN AVENUE, IKEJA', 'ADEOLA ODEKU STREET, VICTORIA ISLAND',
+                    'AMINU KANO CRESCENT, WUSE II, ABUJA', 'TRANS AMADI ROAD, PORT HARCOURT',
+                    'RING ROAD, IBADAN', 'OGUI ROAD, ENUGU', 'ADMIRALTY WAY, LEKKI PHASE 1',
+                    'AWOLOWO ROAD, IKOYI', 'BODIJA ESTATE, IBADAN', 'GWARINPA ESTATE',
+                    'OKOTA ROAD, ISOLO', 'AGEGE MOTOR ROAD, MUSHIN']
+NIGERIAN_PHONES = ['080', '081', '070', '090', '091', '+23480', '23470', '0803', '0805']
+
+FOREIGN_PROFILES = [
+    # (nationality, geo location, state, address, phone prefix)
+    ('UNITED KINGDOM', 'UNITED KINGDOM', 'GREATER LONDON', 'HIGH STREET, LONDON, UK', '+44'),
+    ('BRITISH', 'OTHERS', 'ESSEX', 'STATION ROAD, CHELMSFORD, ENGLAND', '44'),
+    ('AMERICAN', 'USA', 'TEXAS', 'MAIN STREET, HOUSTON, TX, USA', '+1'),
+    ('GHANAIAN', 'GHANA', 'GREATER ACCRA', 'OSU, ACCRA, GHANA', '+233'),
+    ('KENYAN', 'KENYA', 'NAIROBI', 'KENYATTA AVENUE, NAIROBI', '254'),
+    ('CANADIAN', 'CANADA', 'ONTARIO', 'YONGE STREET, TORONTO', '1'),
+    ('OTHERS', 'OTHERS', 'OTHERS', 'SHEIKH ZAYED ROAD, DUBAI, UAE', '+971'),
+    ('', '', '', 'FLAT 4, 12 PARK LANE, MANCHESTER, UNITED KINGDOM', '+44'),
+]
+
+UNKNOWN_ADDRESSES = ['NO 5', 'PLOT 12 BLOCK C', 'HOUSE 7 OFF MAIN ROAD', 'P.O. BOX 331',
+                     'BESIDE THE MARKET', 'OPPOSITE FIRST BANK', 'NIL', '']
+
+PLACEHOLDERS = ['', 'nil', 'N/A', '/', '.', 'OTHERS', '0', 'O']
+
+# ============================================================================
+# ROW GENERATION
+# ============================================================================
+
+def random_digits(rng, n):
+    return f'{rng.randrange(10 ** n):0{n}d}'
+
+def make_email(rng, name, acct_no):
+    first, last = name.split()[0], name.split()[-1]
+    local = rng.choice([f'{first}.{last}', f'{first}{acct_no[-3:]}', f'{last}_{first}'])
+    return f'{local.lower()}@{rng.choice(EMAIL_DOMAINS)}'
+
+def make_location(rng, kind):
+    """Return (nationality, geo location, state, address, phone) for a customer kind."""
+    number = str(rng.randint(1, 250))
+    if kind == 'nigerian':
+        phone = rng.choice(NIGERIAN_PHONES) + random_digits(rng, 8)
+        return (rng.choice(['NIGERIA', 'NIGERIAN', '', 'OTHERS']),
+                rng.choice(['NIGERIA', '', 'OTHERS']),
+                rng.choice(NIGERIAN_STATES + ['', 'OTHERS']),
+                f'{number} {rng.choice(NIGERIAN_STREETS)}', phone)
+    if kind == 'foreign':
+        nationality, geo, state, address, prefix = rng.choice(FOREIGN_PROFILES)
+        return nationality, geo, state, f'{number} {address}', prefix + random_digits(rng, 10)
+    return ('OTHERS', rng.choice(['', 'OTHERS', '/']), rng.choice(['', 'OTHERS', 'N/A']),
+            rng.choice(UNKNOWN_ADDRESSES), rng.choice(PLACEHOLDERS + ['0801234']))
+
+def dirty(rng, value):
+    """Return a messy variant of a value, the way it shows up in real dumps."""
+    choice = rng.randrange(5)
+    if choice == 0:
+        return rng.choice(PLACEHOLDERS)
+    if choice == 1:
+        return value.lower()
+    if choice == 2:
+        return f'  {value} '
+    if choice == 3:
+        return value.replace('@', ' at ') if '@' in value else value + ' |'
+    return value
+
+def generate_row(rng, i, kinds, weights, dirty_rate):
+    acct_no = f'{1000000000 + i}'
+    name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+    kind = rng.choices(kinds, weights)[0]
+    nationality, geo, state, address, phone = make_location(rng, kind)
+    email = make_email(rng, name, acct_no)
+
+    values = {
+        'BRA_CODE': str(rng.randint(1, 600)),
+        'ACCT_NO': acct_no,
+        'CUST_NO': str(rng.randint(100000, 999999)),
+        'CUST_NAME': name,
+        'ACCT_TYPE': rng.choice(['SAVINGS', 'CURRENT', 'DOMICILIARY']),
+        'CUR_CODE': rng.choice(['NGN', 'NGN', 'NGN', 'USD', 'GBP']),
+        'E_MAIL': email,
+        'MOB_NUM': phone,
+        'TEL_NUM': rng.choice(['', '01' + random_digits(rng, 7)]),
+        'NATIONALITY': nationality,
+        'CUS_GEO_LOCA': geo,
+        'STATE_OF_RES': state,
+        'ADDRESS': address,
+        'DATE_OPEN': f'{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1995, 2025)}',
+        'DATE_OF_BIRTH': f'{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1940, 2005)}',
+        'SEX': rng.choice(['M', 'F']),
+        'BVN': '22' + random_digits(rng, 9),
+        'ACCT_STATUS': rng.choice(['ACTIVE', 'ACTIVE', 'DORMANT']),
+        'CUST_TYPE': rng.choice(['INDIVIDUAL', 'INDIVIDUAL', 'CORPORATE']),
+        'OCCUPATION': rng.choice(['TRADER', 'CIVIL SERVANT', 'STUDENT', 'ENGINEER', '']),
+    }
+
+    for col in ('E_MAIL', 'MOB_NUM', 'NATIONALITY', 'CUS_GEO_LOCA', 'STATE_OF_RES', 'ADDRESS'):
+        if rng.random() < dirty_rate:
+            values[col] = dirty(rng, values[col])
+
+    fields = [f'"{values[col]}"' for col in COLUMNS]
+    # Some exports drop the trailing columns of a row
+    if rng.random() < dirty_rate / 20:
+        fields = fields[:rng.randint(1, len(fields) - 1)]
+    return '|'.join(fields)
+
+def generate_dump(output_file, rows, foreign=0.15, unknown=0.05, dirty_rate=0.1, seed=42):
+    """
+    Write a synthetic dump with the given number of rows. foreign and unknown
+    are the shares of foreign and undeterminable customers (the rest are
+    Nigerian); dirty_rate is the share of location/contact values that are
+    replaced by a messy variant.
+    """
+    rng = random.Random(seed)
+    kinds = ['foreign', 'unknown', 'nigerian']
+    weights = [foreign, unknown, max(0.0, 1.0 - foreign - unknown)]
+
+    with open(output_file, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('|'.join(f'"{col}"' for col in COLUMNS) + '\n')
+        batch = []
+        for i in range(rows):
+            batch.append(generate_row(rng, i, kinds, weights, dirty_rate))
+            if len(batch) >= 10000:
+                f.write('\n'.join(batch) + '\n')
+                batch = []
+        if batch:
+            f.write('\n'.join(batch) + '\n')
+
+    print(f"Wrote {rows:,} rows to {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--foreign', type=float, default=0.15, help='share of foreign customers')
+    parser.add_argument('--unknown', type=float, default=0.05, help='share of undeterminable customers')
+    parser.add_argument('--dirty', type=float, default=0.1, help='share of messy values')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generate_dump(args.output, args.rows, args.foreign, args.unknown, args.dirty, args.seed)
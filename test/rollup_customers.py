@@ -0,0 +1,335 @@
+"""
+Script to roll account-level verdicts up to one row per customer.
+
+A customer often holds several accounts, and their accounts can get
+different verdicts (a Nigerian address on one, a foreign number on another).
+Every account with a valid email is classified with the same functions the
+extraction scripts use, grouped by normalized email and CUST_NAME, and the
+verdicts and reasons of the group are merged into one output row. A customer
+whose accounts point both ways is marked CONFLICT. As in the extraction
+pipeline, a check is skipped on rows too short to hold its columns, so the
+rollup covers the same accounts as the per-account outputs.
+
+Grouping needs the accounts sorted by customer. Rows are buffered until the
+buffer reaches the memory limit, then sorted and spilled to a run file on
+disk; the runs are combined with a k-way merge (in several passes if there
+are more than MAX_MERGE_FANIN of them), so memory stays within the limit
+however large the dump is.
+
+Usage:
+    python rollup_customers.py "All Accts.txt" customers.csv --memory-mb 256
+"""
+
+import os
+import sys
+import csv
+import time
+import heapq
+import argparse
+import tempfile
+from operator import itemgetter
+
+from extract_pipeline import clean_email, field, normalize_email
+from extract_reader import RowParser, iter_lines, open_text, read_header
+from extract_verdicts import ACCOUNT_COLUMNS, location_verdict, phone_verdict
+from extract_non_ng_emails import PhoneRule
+from extract_non_ng_address import AddressRule
+
+# ============================================================================
+# SETTINGS
+# ============================================================================
+
+# Default size of the sort buffer
+ROLLUP_MEMORY_MB = 256
+# Run files merged at once; more runs are merged in several passes
+MAX_MERGE_FANIN = 64
+# Account numbers and distinct reasons listed per customer
+MAX_LISTED_ACCOUNTS = 20
+MAX_LISTED_REASONS = 5
+
+# Layout of the per-account records that are sorted; everything is a str so
+# records read back from a run file compare the same as those in memory.
+# A check that was skipped for the row leaves its status and reason ''
+RECORD_FIELDS = ('email_key', 'name_key', 'row', 'account_no', 'email', 'customer_name',
+                 'location_status', 'location_reason', 'phone_status', 'phone_country',
+                 'phone_reason')
+# Customer, then file order within a customer, so the output does not
+# depend on how the input was split into runs
+SORT_KEY = itemgetter(0, 1, 2)
+CUSTOMER_KEY = itemgetter(0, 1)
+
+FIELDNAMES = ['email', 'customer_name', 'status', 'accounts', 'account_nos',
+              'location_status', 'location_reasons', 'phone_status', 'phone_countries',
+              'phone_reasons']
+
+def normalize_name(name):
+    """CUST_NAME with case and spacing differences removed."""
+    return ' '.join(name.upper().split())
+
+# ============================================================================
+# EXTERNAL SORT
+# ============================================================================
+
+def record_size(record):
+    """Approximate memory held by a buffered record, list slot included."""
+    return sys.getsizeof(record) + sum(map(sys.getsizeof, record)) + 8
+
+class ExternalSorter:
+    """
+    Sorts records that may not fit in memory. Records are buffered until
+    their estimated size reaches memory_limit bytes, then sorted and written
+    to a run file in spill_dir (the system temp directory by default).
+    """
+
+    def __init__(self, key, memory_limit, spill_dir=None):
+        self.key = key
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.tmp = None
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.peak_bytes = 0
+        self.runs = []
+        self.spilled = 0
+
+    def add(self, record):
+        self.buffer.append(record)
+        self.buffer_bytes += record_size(record)
+        if self.buffer_bytes >= self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """Sort the buffer and write it out as a run."""
+        self.peak_bytes = max(self.peak_bytes, self.buffer_bytes)
+        self.buffer.sort(key=self.key)
+        self.runs.append(self.write_run(self.buffer))
+        self.spilled += 1
+        self.buffer = []
+        self.buffer_bytes = 0
+
+    def write_run(self, records):
+        if self.tmp is None:
+            self.tmp = tempfile.TemporaryDirectory(prefix='rollup-', dir=self.spill_dir)
+        path = os.path.join(self.tmp.name, f'run{self.spilled:05d}.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows(records)
+        return path
+
+    def read_run(self, path):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.reader(f)
+        os.remove(path)
+
+    def sorted(self):
+        """Yield every record added, in key order."""
+        # Cut the number of runs down until one pass can merge them all
+        while len(self.runs) > MAX_MERGE_FANIN:
+            batch, self.runs = self.runs[:MAX_MERGE_FANIN], self.runs[MAX_MERGE_FANIN:]
+            merged = heapq.merge(*map(self.read_run, batch), key=self.key)
+            self.runs.append(self.write_run(merged))
+            self.spilled += 1
+
+        self.peak_bytes = max(self.peak_bytes, self.buffer_bytes)
+        self.buffer.sort(key=self.key)
+        yield from heapq.merge(*map(self.read_run, self.runs), iter(self.buffer), key=self.key)
+
+    def close(self):
+        """Remove any run files left behind."""
+        if self.tmp is not None:
+            self.tmp.cleanup()
+            self.tmp = None
+
+# ============================================================================
+# MERGING VERDICTS
+# ============================================================================
+
+def merge_status(statuses, undecided):
+    """
+    One status for a set of account statuses: NIGERIAN or NON-NIGERIAN if
+    every definite verdict agrees, CONFLICT if they disagree, otherwise
+    undecided ('' when there were no accounts at all).
+    """
+    definite = [status for status in ('NON-NIGERIAN', 'NIGERIAN', 'CONFLICT') if status in statuses]
+    if 'CONFLICT' in definite or len(definite) > 1:
+        return 'CONFLICT'
+    if definite:
+        return definite[0]
+    return undecided if statuses else ''
+
+def count_into(counts, key, limit=None):
+    """Count key, tracking at most limit distinct keys (the rest go to None)."""
+    if limit is not None and key not in counts and len(counts) >= limit:
+        key = None
+    counts[key] = counts.get(key, 0) + 1
+
+def format_counts(counts):
+    """'A (2); B (1); +3 more' for {key: count}, in order of first appearance."""
+    parts = [f"{key} ({count})" for key, count in counts.items() if key is not None and key != '']
+    if counts.get(None):
+        parts.append(f"+{counts[None]} more")
+    return '; '.join(parts)
+
+class CustomerRollup:
+    """Merged verdicts of one customer's accounts, built one account at a time."""
+
+    def __init__(self, record):
+        self.email = record[4]
+        self.customer_name = record[5]
+        self.accounts = 0
+        self.account_nos = []
+        self.location = {}
+        self.location_reasons = {}
+        self.phone = {}
+        self.phone_countries = {}
+        self.phone_reasons = {}
+
+    def add(self, record):
+        (_, _, _, account_no, _, _, location_status, location_reason,
+         phone_status, phone_country, phone_reason) = record
+        self.accounts += 1
+        if len(self.account_nos) < MAX_LISTED_ACCOUNTS:
+            self.account_nos.append(account_no)
+        if location_status:
+            count_into(self.location, location_status)
+            count_into(self.location_reasons, location_reason, MAX_LISTED_REASONS)
+        if phone_status:
+            count_into(self.phone, phone_status)
+            count_into(self.phone_reasons, phone_reason, MAX_LISTED_REASONS)
+        if phone_country:
+            count_into(self.phone_countries, phone_country, MAX_LISTED_REASONS)
+
+    def row(self):
+        location_status = merge_status(self.location, 'UNKNOWN')
+        phone_status = merge_status(self.phone, 'INVALID')
+        listed = ';'.join(self.account_nos)
+        if self.accounts > len(self.account_nos):
+            listed += f";+{self.accounts - len(self.account_nos)} more"
+        return {
+            'email': self.email,
+            'customer_name': self.customer_name,
+            'status': merge_status({location_status, phone_status} - {'INVALID'}, 'UNKNOWN'),
+            'accounts': self.accounts,
+            'account_nos': listed,
+            'location_status': location_status,
+            'location_reasons': format_counts(self.location_reasons),
+            'phone_status': phone_status,
+            'phone_countries': format_counts(self.phone_countries),
+            'phone_reasons': format_counts(self.phone_reasons),
+        }
+
+# ============================================================================
+# ROLLUP
+# ============================================================================
+
+def account_records(input_file, phone_rule, address_rule, counts):
+    """
+    Classify every row of the dump and yield a record (see RECORD_FIELDS)
+    for each one with a valid email. The rules must be bound to the dump's
+    header; their min_fields decide which checks a row is long enough for.
+    """
+    columns, data_start = read_header(input_file)
+    idx = {name: columns.index(name) if name in columns else None for name in ACCOUNT_COLUMNS}
+    parser = RowParser(len(columns), [i for i in idx.values() if i is not None])
+
+    for row, line in enumerate(iter_lines(input_file, data_start)):
+        counts['total_records'] += 1
+        parts = parser(line)
+        check_phone = len(parts) > phone_rule.min_fields
+        check_location = len(parts) > address_rule.min_fields
+        if not (check_phone or check_location):
+            continue
+        email = clean_email(field(parts, idx['E_MAIL']))
+        if not email:
+            continue
+
+        values = {name: field(parts, i) for name, i in idx.items()}
+        phone_status = phone_country = phone_reason = location_status = location_reason = ''
+        if check_phone:
+            counts['phone_checked'] += 1
+            phone_status, phone_country, phone_reason = phone_verdict(values['MOB_NUM'])
+        if check_location:
+            counts['location_checked'] += 1
+            location_status, location_reason = location_verdict(values)
+        counts['records_with_email'] += 1
+        yield (normalize_email(email), normalize_name(values['CUST_NAME']), f'{row:012d}',
+               values['ACCT_NO'], email, values['CUST_NAME'],
+               location_status, location_reason, phone_status, phone_country or '', phone_reason)
+
+def rollup_customers(input_file, output_file, memory_mb=ROLLUP_MEMORY_MB, spill_dir=None):
+    """
+    Write one row per customer (normalized email + CUST_NAME) of the dump,
+    merging the verdicts of all their accounts. memory_mb caps the sort
+    buffer; beyond it, sorted runs are spilled to spill_dir.
+    Returns the counters, or None if a required column is missing.
+    """
+    columns, _ = read_header(input_file)
+    phone_rule, address_rule = PhoneRule(), AddressRule()
+    try:
+        for rule in (phone_rule, address_rule):
+            rule.bind(columns)
+    except ValueError as e:
+        print(f"Error: Required column not found - {e}")
+        return
+
+    print(f"Processing file: {input_file}")
+    began = time.perf_counter()
+    counts = {'total_records': 0, 'records_with_email': 0, 'phone_checked': 0,
+              'location_checked': 0, 'customers': 0}
+    statuses = {}
+    sorter = ExternalSorter(SORT_KEY, memory_mb * 1024 * 1024, spill_dir)
+    try:
+        for record in account_records(input_file, phone_rule, address_rule, counts):
+            sorter.add(record)
+        sorted_at = time.perf_counter()
+
+        with open_text(output_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            customer = None
+            for record in sorter.sorted():
+                if customer is None or CUSTOMER_KEY(record) != key:
+                    if customer is not None:
+                        row = customer.row()
+                        writer.writerow(row)
+                        count_into(statuses, row['status'])
+                    customer, key = CustomerRollup(record), CUSTOMER_KEY(record)
+                customer.add(record)
+            if customer is not None:
+                row = customer.row()
+                writer.writerow(row)
+                count_into(statuses, row['status'])
+    finally:
+        sorter.close()
+
+    counts['customers'] = sum(statuses.values())
+    counts['statuses'] = statuses
+    counts['spilled_runs'] = sorter.spilled
+    elapsed = time.perf_counter() - began
+
+    print(f"\n{'='*60}")
+    print("CUSTOMER ROLLUP SUMMARY")
+    print(f"{'='*60}")
+    print(f"Total records processed:     {counts['total_records']:,}")
+    print(f"Records with valid email:    {counts['records_with_email']:,} "
+          f"(phone checked: {counts['phone_checked']:,}, location checked: {counts['location_checked']:,})")
+    print(f"Customers written:           {counts['customers']:,}")
+    for status in ('NON-NIGERIAN', 'CONFLICT', 'UNKNOWN', 'NIGERIAN'):
+        print(f"  - {status + ':':<26}{statuses.get(status, 0):,}")
+    print(f"Sort buffer:                 {sorter.peak_bytes / (1024 * 1024):,.1f} MB peak "
+          f"(limit {memory_mb:,} MB), {sorter.spilled:,} runs spilled")
+    print(f"Elapsed:                     {elapsed:.2f}s (classify {sorted_at - began:.2f}s, "
+          f"merge {elapsed - (sorted_at - began):.2f}s)")
+    print(f"\nOutput file: {output_file}")
+    print(f"{'='*60}")
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='account dump, plain or compressed (.gz, .bz2, .xz)')
+    parser.add_argument('output', help='customer CSV to write (.gz/.bz2/.xz to compress)')
+    parser.add_argument('--memory-mb', type=int, default=ROLLUP_MEMORY_MB,
+                        help=f'sort buffer size before spilling to disk (default: {ROLLUP_MEMORY_MB})')
+    parser.add_argument('--spill-dir', help='directory for sorted runs (default: system temp)')
+    args = parser.parse_args()
+
+    rollup_customers(args.input, args.output, args.memory_mb, args.spill_dir)